@@ -1,77 +1,94 @@
-
 import streamlit as st
 import pandas as pd
-import yfinance as yf
 from datetime import date, datetime
-import json
 import plotly.express as px
-import os
 import time
-from io import StringIO
-import requests
+import os
+from backend.agregados import proventos_mensais
+from backend.analise import AnaliseRentabilidade
+from backend.armazem_dividendos import ArmazemDividendos
+from backend.cache_cotacoes import CacheCotacoes
+from backend.catalogo import CatalogoTickers
+from backend.graficos import JANELAS, SeriesPatrimonio, inicio_da_janela
+from backend.instrumentacao import coletor_do_processo, instrumentacao, nova_execucao
+from backend.motor import MotorCarteira
+from backend.posicoes import LivroDePosicoes
+from backend.repositorio import obter_repositorio
+from backend.resultados import IDADE_MAXIMA_RESULTADOS, calcular_resultados, carregar_resultados
+from backend.validade_tickers import IndiceValidade
 
 
 # --- Configurações da Página ---
 st.set_page_config(page_title="Meu Painel de Investimentos", layout="wide")
+nova_execucao()
+inicio_rerun = time.perf_counter()
+MODO_DEBUG = os.environ.get("KINVO_DEBUG") == "1" or st.query_params.get("debug") == "1"
 
 # --- Funções de Backend ---
-def extrair_dividendos_fundamentus(ticker_symbol):
-    ticker_sem_sa = ticker_symbol.replace(".SA", "")
-    url = f"https://www.fundamentus.com.br/proventos.php?papel={ticker_sem_sa}"
-    headers = {"User-Agent": "Mozilla/5.0"}
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        tabelas = pd.read_html(StringIO(response.text), decimal=',', thousands='.')
-        if not tabelas:
-            return []
-        df = tabelas[0]
-        df_renomeado = df.rename(columns={"Data": "data_ex", "Valor": "valor", "Data de Pagamento": "data_pag"})
-        df_renomeado['data_ex'] = pd.to_datetime(df_renomeado['data_ex'], format='%d/%m/%Y').dt.date
-        df_renomeado['data_pag'] = pd.to_datetime(df_renomeado['data_pag'], format='%d/%m/%Y', errors='coerce').dt.date
-        resultado = df_renomeado[['valor', 'data_ex', 'data_pag']].to_dict('records')
-        return resultado
-    except Exception:
-        return []
-
-def carregar_lista_de_ativos():
-    ativos_manuais = ["IVVB11.SA", "GOLD11.SA", "SMAL11.SA", "BOVA11.SA"]
-    try:
-        with open('data/all_tickers.json', 'r', encoding='utf-8') as f:
-            dados = json.load(f)
-        lista_completa = dados.get("acoes_b3", []) + dados.get("criptomoedas", []) + dados.get("etfs", []) + ativos_manuais
-    except FileNotFoundError:
-        lista_completa = ["BTC-USD", "ETH-USD", "PETR4.SA", "VALE3.SA", "ITUB4.SA", "GOLD11.SA"]
-    return ["Selecione ou pesquise um ativo..."] + sorted(list(set(lista_completa)))
-
-def carregar_carteira():
-    caminho = 'data/carteira.json'
-    if not os.path.exists(caminho): return {}
-    try:
-        with open(caminho, 'r', encoding='utf-8') as arquivo:
-            return json.load(arquivo)
-    except (FileNotFoundError, json.JSONDecodeError): return {}
-
-def salvar_carteira(carteira):
-    with open('data/carteira.json', 'w', encoding='utf-8') as arquivo:
-        json.dump(carteira, arquivo, indent=4)
-
-def buscar_taxa_dolar():
-    try:
-        dolar = yf.Ticker("BRL=X")
-        return dolar.history(period="1d", auto_adjust=False)['Close'].iloc[-1]
-    except Exception: return None
-
-def buscar_preco_ativo(ticker_symbol, taxa_dolar):
-    try:
-        ticker = yf.Ticker(ticker_symbol)
-        if "-USD" in ticker_symbol:
-            preco_usd = ticker.info.get('regularMarketPrice')
-            return preco_usd * taxa_dolar if preco_usd and taxa_dolar else None
-        else:
-            return ticker.history(period='1d')['Close'].iloc[-1]
-    except Exception:
-        return None
+@st.cache_resource
+def _repositorio():
+    return obter_repositorio()
+
+repositorio = _repositorio()
+
+OPCAO_SEM_ATIVO = "Selecione ou pesquise um ativo..."
+LIMITE_SUGESTOES = 50
+LIMITE_MARCADORES = 100
+
+@st.cache_resource
+def obter_catalogo():
+    return CatalogoTickers.carregar() or CatalogoTickers.de_dados(repositorio.carregar_tickers())
+
+@st.cache_resource
+def _livro_de_posicoes():
+    return LivroDePosicoes()
+
+def obter_livro_de_posicoes():
+    return _livro_de_posicoes().sincronizar(repositorio)
+
+@st.cache_resource
+def obter_armazem_dividendos():
+    return ArmazemDividendos(repositorio)
+
+@st.cache_resource
+def obter_cache_cotacoes():
+    return CacheCotacoes()
+
+@st.cache_resource
+def obter_motor():
+    return MotorCarteira()
+
+@st.cache_resource
+def obter_series_patrimonio():
+    return SeriesPatrimonio(repositorio)
+
+@st.cache_resource
+def obter_analise():
+    return AnaliseRentabilidade()
+
+@st.cache_resource(ttl=IDADE_MAXIMA_RESULTADOS, max_entries=4, show_spinner=False)
+def _resultados(versao_carteira, dia, versao_proventos, geracao_cotacoes, _livro):
+    # Os pré-calculados só servem enquanto as suas cotações ainda estiverem dentro da validade
+    idade_maxima = min(IDADE_MAXIMA_RESULTADOS, obter_cache_cotacoes().idade_maxima(_livro.tickers_com_posicao()))
+    resultado = carregar_resultados(versao_carteira, idade_maxima)
+    if resultado is None:
+        resultado = calcular_resultados(repositorio, _livro, obter_cache_cotacoes().obter_precos, obter_armazem_dividendos(), obter_motor(), obter_analise(),
+                                        proventos_em_segundo_plano=True)
+    return resultado
+
+def obter_resultados(livro):
+    """Resultados do atualizador em segundo plano ou, sem eles, calculados aqui (incluindo o snapshot do dia).
+
+    Ficam em memória por versão da carteira, dia, versão dos proventos e geração das
+    cotações (que mudam quando as atualizações em segundo plano trazem novidades): um
+    rerun por mudança de filtro ou de período só volta a fatiar o que já foi calculado,
+    e os preços mostrados respeitam a validade por classe do cache de cotações.
+    """
+    geracao_cotacoes = obter_cache_cotacoes().geracao(livro.tickers_com_posicao())
+    return _resultados(livro.versao, date.today(), obter_armazem_dividendos().versao, geracao_cotacoes, livro)
+
+def formatar_percentagem(valor, sufixo=""):
+    return f"{valor:.2f}%{sufixo}" if valor is not None and pd.notna(valor) else "-"
 
 def colorir_status(status):
     if status == 'Qualificado': return 'color: lightgreen'
@@ -84,72 +101,37 @@ def colorir_rentabilidade(val):
         return f'color: {color}'
     return ''
 
+@st.cache_resource
+def obter_indice_validade():
+    indice = IndiceValidade()
+    indice.semear(repositorio.carregar_carteira().keys())
+    return indice
+
 def validar_ticker(ticker_symbol):
-    try:
-        ticker = yf.Ticker(ticker_symbol)
-        return not ticker.history(period='1d').empty
-    except Exception: return False
-
-@st.cache_data(ttl=3600)
-def buscar_info_dividendos_detalhados(ticker_symbol):
-    if not ticker_symbol.endswith('.SA'):
-        return []
-
-    dividendos = extrair_dividendos_fundamentus(ticker_symbol)
-    hoje = date.today()
-    proventos_finais = []
-    filtro_data = date(2000, 1, 1)
-    for d in dividendos:
-        if d['data_ex'] < filtro_data:
-            continue
-        
-        status = None
-        if d['data_ex'] > hoje:
-            if d['data_pag'] is not None and pd.notna(d['data_pag']) and d['data_pag'] > hoje:
-                status = "Provisionado"
-            else:
-                status = "Anunciado"
-        else:
-            if d['data_pag'] is not None and pd.notna(d['data_pag']):
-                if d['data_pag'] > hoje:
-                    status = "Qualificado"
-                else:
-                    status = "Pago"
-            else:
-                status = "Aguardando Pagamento"
-        
-        if status:
-            proventos_finais.append({
-                "valor": d['valor'],
-                "data_ex": d['data_ex'],
-                "data_pag": d['data_pag'],
-                "status": status
-            })
-    return proventos_finais
+    return obter_indice_validade().validar(ticker_symbol)
+
+def rotulo_do_ticker(opcao):
+    return opcao if opcao == OPCAO_SEM_ATIVO else f"{opcao} ({obter_catalogo().classe(opcao)})"
 
 # --- Formulário na Barra Lateral ---
 with st.sidebar:
     st.header("Adicionar Nova Compra")
-    lista_de_ativos_completa = carregar_lista_de_ativos()
-    novo_ticker = st.selectbox("Ticker do Ativo", options=lista_de_ativos_completa)
+    termo_pesquisa = st.text_input("Pesquisar Ativo", placeholder="Ex.: PETR4, BTC")
+    sugestoes = obter_catalogo().pesquisar(termo_pesquisa, limite=LIMITE_SUGESTOES)
+    novo_ticker = st.selectbox("Ticker do Ativo", options=[OPCAO_SEM_ATIVO] + sugestoes, index=0, format_func=rotulo_do_ticker)
     data_compra = st.date_input("Data da Compra", value=date.today())
     qtd_comprada = st.number_input("Quantidade Comprada", min_value=0.0, format="%.8f")
     preco_unitario = st.number_input("Preço Unitário (R$)", min_value=0.0, format="%.2f")
     botao_adicionar = st.button("Adicionar Compra")
     if botao_adicionar:
-        if novo_ticker == lista_de_ativos_completa[0] or qtd_comprada <= 0 or preco_unitario <= 0:
+        if novo_ticker == OPCAO_SEM_ATIVO or qtd_comprada <= 0 or preco_unitario <= 0:
             st.error("Por favor, selecione um ativo e preencha os outros campos.")
         elif not validar_ticker(novo_ticker):
             st.error(f"Ticker '{novo_ticker}' parece ser inválido. A transação não foi guardada.")
         else:
             nova_transacao = {"tipo": "compra", "data": data_compra.strftime("%Y-%m-%d"), "quantidade": qtd_comprada, "preco_unitario": preco_unitario}
-            carteira_atual = carregar_carteira()
             ticker_upper = novo_ticker.upper()
-            if ticker_upper in carteira_atual:
-                carteira_atual[ticker_upper].append(nova_transacao)
-            else:
-                carteira_atual[ticker_upper] = [nova_transacao]
-            salvar_carteira(carteira_atual)
+            _livro_de_posicoes().registar_transacao(repositorio, ticker_upper, nova_transacao)
             st.success("Compra adicionada com sucesso!")
             time.sleep(1)
             st.rerun()
@@ -158,78 +140,19 @@ with st.sidebar:
 st.title("Meu Painel de Investimentos")
 st.write(f"Dados atualizados em: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
 
-minha_carteira = carregar_carteira()
-
-if minha_carteira:
-    taxa_dolar_atual = buscar_taxa_dolar()
-    dados_processados, lista_de_aportes, proventos_detalhados = [], [], []
-    for ticker, transacoes in minha_carteira.items():
-        quantidade_total, custo_total = 0, 0.0
-        for t in transacoes:
-            if t["tipo"] == "compra":
-                quantidade_total += t["quantidade"]
-                custo_total += t["quantidade"] * t["preco_unitario"]
-                lista_de_aportes.append({"Data": t["data"], "Ticker": ticker, "Valor do Aporte": t["quantidade"] * t["preco_unitario"]})
-        if quantidade_total > 0:
-            preco_medio = custo_total / quantidade_total
-            preco_atual = buscar_preco_ativo(ticker, taxa_dolar_atual)
-            valor_atual = preco_atual * quantidade_total if preco_atual else custo_total
-            
-            lista_proventos = buscar_info_dividendos_detalhados(ticker)
-            valor_total_qualificado = 0
-            valor_total_recebido = 0
-            
-            for provento in lista_proventos:
-                quantidade_habilitada = sum(t['quantidade'] for t in transacoes if t['tipo'] == 'compra' and datetime.strptime(t["data"], "%Y-%m-%d").date() < provento['data_ex'])
-                valor_a_receber = quantidade_habilitada * provento['valor'] if quantidade_habilitada > 0 else 0
-                data_pagamento_exibir = provento['data_pag'] if provento['data_pag'] is not None and pd.notna(provento['data_pag']) else 'A confirmar'
-                proventos_detalhados.append({
-                    "Ativo": ticker,
-                    "Status": provento['status'],
-                    "Valor por Ação (R$)": provento['valor'],
-                    "Data Ex": provento['data_ex'],
-                    "Data Pagamento": data_pagamento_exibir,
-                    "Total a Receber (R$)": valor_a_receber
-                })
-                if provento['status'] == 'Qualificado':
-                    valor_total_qualificado += valor_a_receber
-                elif provento['status'] == 'Pago':
-                    valor_total_recebido += valor_a_receber
-            
-            dados_processados.append({
-                "Ativo": ticker, "Quantidade": quantidade_total, "Preço Médio (R$)": preco_medio,
-                "Custo Total (R$)": custo_total, "Preço Atual (R$)": preco_atual, "Valor Atual (R$)": valor_atual,
-                "Dividendos a Receber (R$)": valor_total_qualificado,
-                "Dividendos Recebidos (R$)": valor_total_recebido
-            })
-    
-    df_carteira = pd.DataFrame(dados_processados)
+livro_de_posicoes = obter_livro_de_posicoes()
+
+if livro_de_posicoes.posicoes:
+    with instrumentacao().medir("app.resultados"):
+        resultado = obter_resultados(livro_de_posicoes)
+    df_carteira = resultado["carteira"]
     if not df_carteira.empty:
-        df_carteira['Lucro/Prejuízo (R$)'] = df_carteira['Valor Atual (R$)'] - df_carteira['Custo Total (R$)']
-        df_carteira['Rentabilidade (%)'] = (df_carteira['Lucro/Prejuízo (R$)'] / df_carteira['Custo Total (R$)'] * 100).fillna(0)
-        df_carteira['Rentabilidade com Div. (%)'] = ((df_carteira['Valor Atual (R$)'] + df_carteira['Dividendos Recebidos (R$)'] - df_carteira['Custo Total (R$)']) / df_carteira['Custo Total (R$)'] * 100).fillna(0)
-        df_carteira['Lucro/Prejuízo com Div. (R$)'] = df_carteira['Valor Atual (R$)'] + df_carteira['Dividendos Recebidos (R$)'] - df_carteira['Custo Total (R$)']
-
-        def categorizar_ativo(ticker):
-            if "-USD" in ticker: return "Criptomoeda"
-            elif "11.SA" in ticker: return "ETF"
-            else: return "Ação"
-        df_carteira['Tipo'] = df_carteira['Ativo'].apply(categorizar_ativo)
-        
         st.subheader("Evolução do Património")
-        nome_ficheiro_historico = 'data/historico_portfolio.csv'
-        total_atual_completo = df_carteira["Valor Atual (R$)"].sum()
-        hoje = date.today().strftime('%Y-%m-%d')
-        if os.path.exists(nome_ficheiro_historico) and os.path.getsize(nome_ficheiro_historico) > 0:
-            df_historico = pd.read_csv(nome_ficheiro_historico)
-            if hoje not in df_historico['Data'].values:
-                novo_registo = pd.DataFrame([{'Data': hoje, 'ValorTotal': total_atual_completo}])
-                df_historico = pd.concat([df_historico, novo_registo], ignore_index=True)
-        else:
-            df_historico = pd.DataFrame([{'Data': hoje, 'ValorTotal': total_atual_completo}])
-        df_historico.to_csv(nome_ficheiro_historico, index=False)
-        fig_historico = px.line(df_historico, x='Data', y='ValorTotal', title='Valor Total da Carteira ao Longo do Tempo', markers=True)
-        st.plotly_chart(fig_historico, use_container_width=True)
+        janela_historico = st.radio("Período", list(JANELAS), index=len(JANELAS) - 1, horizontal=True, key="janela_historico")
+        with instrumentacao().medir("app.grafico_historico"):
+            df_historico = obter_series_patrimonio().serie(janela_historico)
+            fig_historico = px.line(df_historico, x='Data', y='ValorTotal', title='Valor Total da Carteira ao Longo do Tempo', markers=len(df_historico) <= LIMITE_MARCADORES)
+            st.plotly_chart(fig_historico, use_container_width=True)
         
         st.subheader("Filtros")
         tipos_de_ativo = df_carteira['Tipo'].unique().tolist()
@@ -248,13 +171,30 @@ if minha_carteira:
         lucro_prejuizo_total_com_div = total_atual_filtrado + total_dividendos_recebidos_geral - total_investido
         rentabilidade_total_com_div = (lucro_prejuizo_total_com_div / total_investido) * 100 if total_investido > 0 else 0
 
-        col1, col2, col3, col4, col5, col6 = st.columns(6)
+        recebidos_12_meses = resultado.get("recebidos_12_meses")
+        total_recebido_12_meses = recebidos_12_meses.reindex(df_filtrado["Ativo"]).sum() if recebidos_12_meses is not None else 0.0
+
+        col1, col2, col3, col4, col5, col6, col7 = st.columns(7)
         col1.metric("Valor Total Investido", f"R$ {total_investido:,.2f}")
         col2.metric("Valor Atual da Carteira", f"R$ {total_atual_filtrado:,.2f}", f"{lucro_prejuizo_total:,.2f} R$")
         col3.metric("Rentabilidade Total", f"{rentabilidade_total:.2f}%")
         col4.metric("Rentab. Total c/ Div.", f"{rentabilidade_total_com_div:.2f}%", f"{rentabilidade_total_com_div:.2f}%")
         col5.metric("Dividendos a Receber", f"R$ {total_dividendos:,.2f}")
         col6.metric("Total Div. Recebidos", f"R$ {total_dividendos_recebidos_geral:,.2f}")
+        col7.metric("Div. Recebidos (12 meses)", f"R$ {total_recebido_12_meses:,.2f}")
+
+        df_analise = resultado.get("analise")
+        if df_analise is not None and not df_analise.empty:
+            st.subheader("Análise de Rentabilidade")
+            analise_carteira = df_analise.iloc[0]
+            col_twr, col_xirr, col_vol, col_dd = st.columns(4)
+            col_twr.metric("Rentab. Ponderada no Tempo (TWR)", formatar_percentagem(analise_carteira["TWR (%)"]))
+            col_xirr.metric("Rentab. Ponderada pelo Dinheiro (XIRR)", formatar_percentagem(analise_carteira["XIRR (% a.a.)"], " a.a."))
+            col_vol.metric("Volatilidade Anual", formatar_percentagem(analise_carteira["Volatilidade (% a.a.)"]))
+            col_dd.metric("Drawdown Máximo", formatar_percentagem(analise_carteira["Drawdown Máx. (%)"]), formatar_percentagem(-analise_carteira["Drawdown Atual (%)"] if pd.notna(analise_carteira["Drawdown Atual (%)"]) else None, " atual"))
+            df_analise_ativos = df_analise[df_analise["Ativo"].isin(df_filtrado["Ativo"])]
+            with st.expander("Métricas por Ativo"):
+                st.dataframe(df_analise_ativos.style.format({coluna: "{:+.2f}%" for coluna in df_analise.columns[1:]}, na_rep="-"), use_container_width=True, hide_index=True)
 
         st.subheader("Detalhes dos Ativos")
         df_para_exibir = df_filtrado[[ "Ativo", "Tipo", "Quantidade", "Preço Médio (R$)", "Custo Total (R$)", "Preço Atual (R$)", "Valor Atual (R$)", "Dividendos Recebidos (R$)", "Dividendos a Receber (R$)", "Lucro/Prejuízo (R$)", "Lucro/Prejuízo com Div. (R$)", "Rentabilidade (%)", "Rentabilidade com Div. (%)" ]]
@@ -289,46 +229,32 @@ if minha_carteira:
             "Rent. c/ Div. (%)": "{:+.2f}%" 
         }
         
-        st.dataframe(df_para_exibir.style.apply(lambda col: col.map(colorir_rentabilidade), subset=['L/P (R$)', 'L/P c/ Div. (R$)', 'Rent. (%)', 'Rent. c/ Div. (%)']).format(formatador, decimal=",", thousands="."), use_container_width=True)
+        with instrumentacao().medir("app.tabela_ativos", linhas=len(df_para_exibir)):
+            st.dataframe(df_para_exibir.style.apply(lambda col: col.map(colorir_rentabilidade), subset=['L/P (R$)', 'L/P c/ Div. (R$)', 'Rent. (%)', 'Rent. c/ Div. (%)']).format(formatador, decimal=",", thousands="."), use_container_width=True)
         
         st.subheader("Detalhes dos Proventos")
-        if proventos_detalhados:
-            df_proventos = pd.DataFrame(proventos_detalhados)
-            df_proventos = df_proventos[df_proventos['Total a Receber (R$)'] > 0]
+        if not resultado["direitos"].empty:
+            df_proventos = resultado["proventos"]
             
             if not df_proventos.empty:
-                df_proventos['Data Pagamento'] = df_proventos['Data Pagamento'].astype(str)
-                status_order = {'Qualificado': 1, 'Aguardando Pagamento': 2, 'Pago': 3, 'Provisionado': 4, 'Anunciado': 5}
-                df_proventos['Status_Order'] = df_proventos['Status'].map(status_order).fillna(99)
-                df_proventos.sort_values(by=['Status_Order', 'Data Pagamento'], ascending=[True, False], inplace=True)
-                df_proventos.drop(columns=['Status_Order'], inplace=True)
-                df_proventos['Data Ex'] = pd.to_datetime(df_proventos['Data Ex']).dt.strftime('%d/%m/%Y')
-                df_proventos['Data Pagamento'] = df_proventos['Data Pagamento'].apply(
-                    lambda x: x.strftime('%d/%m/%Y') if isinstance(x, (datetime, date)) else str(x)
-                )
-                
-                st.dataframe(df_proventos.style
-                    .apply(lambda col: col.map(colorir_status), subset=['Status'])
-                    .format({
-                        "Valor por Ação (R$)": "R$ {:,.4f}",
-                        "Total a Receber (R$)": "R$ {:,.2f}"
-                    }), use_container_width=True, hide_index=True)
-
-                df_hist_div = df_proventos.copy()
-                df_hist_div = df_hist_div[df_hist_div['Data Pagamento'] != 'A confirmar']
-                if not df_hist_div.empty:
-                    df_hist_div['Data Pagamento'] = pd.to_datetime(df_hist_div['Data Pagamento'], format='mixed')
-                    hoje = pd.to_datetime(date.today())
-                    data_inicio = hoje - pd.DateOffset(months=12)
-                    df_hist_div = df_hist_div[df_hist_div['Data Pagamento'] >= data_inicio]
-                    df_hist_div['AnoMes'] = df_hist_div['Data Pagamento'].dt.strftime('%Y-%m')
-                    recebidos = df_hist_div[df_hist_div['Data Pagamento'] < hoje].groupby('AnoMes')['Total a Receber (R$)'].sum()
-                    previstos = df_hist_div[df_hist_div['Data Pagamento'] >= hoje].groupby('AnoMes')['Total a Receber (R$)'].sum()
-                    df_grafico = pd.DataFrame({'Recebidos': recebidos, 'Previstos': previstos}).fillna(0)
+                with instrumentacao().medir("app.tabela_proventos", linhas=len(df_proventos)):
+                    st.dataframe(df_proventos.style
+                        .apply(lambda col: col.map(colorir_status), subset=['Status'])
+                        .format({
+                            "Valor por Ação (R$)": "R$ {:,.4f}",
+                            "Total a Receber (R$)": "R$ {:,.2f}"
+                        }), use_container_width=True, hide_index=True)
+
+                janela_dividendos = st.radio("Período dos dividendos", list(JANELAS), index=list(JANELAS).index("1A"), horizontal=True, key="janela_dividendos")
+                agregado_proventos = resultado.get("proventos_mensais")
+                if agregado_proventos is None:
+                    agregado_proventos = proventos_mensais(resultado["direitos"])
+                df_grafico = agregado_proventos.quadro(tipos_selecionados, inicio=inicio_da_janela(janela_dividendos))
+                if not df_grafico.empty:
                     st.subheader('Histórico de Dividendos (Mês a Mês)')
                     fig_div = px.bar(df_grafico, x=df_grafico.index, y=['Recebidos', 'Previstos'], barmode='group',
                                      title='Dividendos Recebidos e Previstos por Mês',
-                                     labels={'value': 'R$','AnoMes': 'Mês'})
+                                     labels={'value': 'R$'})
                     st.plotly_chart(fig_div, use_container_width=True)
             else:
                 st.info("Nenhum provento (qualificado ou provisionado) com valor a receber encontrado para as ações na sua carteira.")
@@ -336,19 +262,16 @@ if minha_carteira:
             st.info("Nenhum provento (qualificado ou provisionado) encontrado para as ações na sua carteira.")
 
         st.subheader("Análise de Aportes")
-        if lista_de_aportes:
+        if not resultado["aportes"].empty:
             col_graf_aportes, col_lista_aportes = st.columns(2)
             with col_graf_aportes:
-                df_aportes = pd.DataFrame(lista_de_aportes)
-                df_aportes['Data'] = pd.to_datetime(df_aportes['Data'])
-                aportes_mensais = df_aportes.set_index('Data').groupby(pd.Grouper(freq='M'))['Valor do Aporte'].sum().reset_index()
-                aportes_mensais['Mês'] = aportes_mensais['Data'].dt.strftime('%Y-%m')
+                with instrumentacao().medir("app.aportes_mensais"):
+                    aportes_mensais = livro_de_posicoes.aportes_mensais.quadro(tipos_selecionados, preencher_meses=True).reset_index()
                 fig_aportes = px.bar(aportes_mensais, x='Mês', y='Valor do Aporte', title='Aportes Mensais', text_auto='.2s')
                 st.plotly_chart(fig_aportes, use_container_width=True)
             with col_lista_aportes:
                 st.write("Histórico de Aportes (Dia a Dia)")
-                df_aportes_detalhado = pd.DataFrame(lista_de_aportes)
-                df_aportes_detalhado.sort_values(by="Data", ascending=False, inplace=True)
+                df_aportes_detalhado = resultado["aportes"].copy()
                 df_aportes_detalhado['Valor do Aporte'] = df_aportes_detalhado['Valor do Aporte'].map('R$ {:,.2f}'.format)
                 st.dataframe(df_aportes_detalhado.rename(columns={'Ticker': 'Ativo'}), use_container_width=True, hide_index=True)
         
@@ -363,4 +286,25 @@ if minha_carteira:
             
             col_graf2.plotly_chart(fig_alocacao_tipo, use_container_width=True)
 else:
-    st.info("A sua carteira está vazia. Adicione a sua primeira compra através do formulário na barra lateral.")
\ No newline at end of file
+    st.info("A sua carteira está vazia. Adicione a sua primeira compra através do formulário na barra lateral.")
+
+instrumentacao().registar_etapa("app.rerun", time.perf_counter() - inicio_rerun)
+instrumentacao().acrescentar_registo()
+def mostrar_tempos(titulo, coletor, prefixo):
+    with st.sidebar.expander(titulo):
+        resumo = coletor.resumo()
+        if resumo["etapas"]:
+            st.dataframe(pd.DataFrame(resumo["etapas"]).sort_values("duracao", ascending=False), use_container_width=True, hide_index=True)
+        if resumo["contadores"]:
+            st.dataframe(pd.Series(resumo["contadores"], name="Total").sort_index(), use_container_width=True)
+        lentos = coletor.tickers_mais_lentos()
+        if lentos:
+            st.write("Tickers mais lentos")
+            st.dataframe(pd.DataFrame(lentos, columns=["Fonte", "Ticker", "Segundos"]), use_container_width=True, hide_index=True)
+        st.download_button("Exportar JSON", coletor.para_json(), file_name=f"{prefixo}.json", mime="application/json", key=f"{prefixo}_json")
+        st.download_button("Exportar CSV", coletor.para_csv(), file_name=f"{prefixo}.csv", mime="text/csv", key=f"{prefixo}_csv")
+
+if MODO_DEBUG:
+    mostrar_tempos("Tempos (debug)", instrumentacao(), "tempos")
+    # Proventos do Fundamentus, cotações e câmbio atualizados em threads fora deste rerun
+    mostrar_tempos("Tempos em segundo plano (debug)", coletor_do_processo(), "tempos_segundo_plano")
@@ -0,0 +1 @@
+"""Lógica de dados e cálculo partilhada pela aplicação e pelos scripts."""
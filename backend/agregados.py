@@ -0,0 +1,76 @@
+from datetime import date
+
+import pandas as pd
+
+from backend.ativos import categorizar_ativo
+
+COLUNAS_PROVENTOS_MENSAIS = ["Recebidos", "Previstos"]
+
+
+def _mes(data):
+    """'AAAA-MM' de uma data ISO, date ou Timestamp."""
+    return data.strftime('%Y-%m') if hasattr(data, 'strftime') else str(data)[:7]
+
+
+class AgregadoMensal:
+    """Somas mensais por ticker e por tipo de ativo, atualizadas a cada registo que entra.
+
+    Cada registo só soma o valor em duas células (mês x ticker e mês x tipo), pelo que os
+    gráficos e os filtros leem os totais já prontos, sem converter datas nem reagrupar.
+    """
+
+    def __init__(self, colunas):
+        self.colunas = list(colunas)
+        self.por_ticker = {}
+        self.por_tipo = {}
+        self.tipos = {}
+
+    def acrescentar(self, data, ticker, coluna, valor):
+        mes = _mes(data)
+        tipo = self.tipos.get(ticker)
+        if tipo is None:
+            tipo = self.tipos[ticker] = categorizar_ativo(ticker)
+        indice = self.colunas.index(coluna)
+        for chave, somas in (((mes, ticker), self.por_ticker), ((mes, tipo), self.por_tipo)):
+            linha = somas.get(chave)
+            if linha is None:
+                linha = somas[chave] = [0.0] * len(self.colunas)
+            linha[indice] += valor
+
+    def quadro(self, tipos=None, tickers=None, inicio=None, preencher_meses=False):
+        """DataFrame indexado por 'Mês' (AAAA-MM) com uma coluna por valor somado.
+
+        Filtra por tipos de ativo (ex.: a seleção de "Filtros"), por tickers e pelo mês de `inicio`.
+        Com `preencher_meses`, os meses sem registos entre o primeiro e o último entram com 0.
+        """
+        if tickers is not None:
+            tickers = set(tickers)
+            somas = {chave: linha for chave, linha in self.por_ticker.items() if chave[1] in tickers}
+        else:
+            tipos = set(tipos) if tipos is not None else None
+            somas = {chave: linha for chave, linha in self.por_tipo.items() if tipos is None or chave[1] in tipos}
+        primeiro_mes = _mes(inicio) if inicio is not None else None
+        meses = {}
+        for (mes, _), linha in somas.items():
+            if primeiro_mes is not None and mes < primeiro_mes:
+                continue
+            total = meses.setdefault(mes, [0.0] * len(self.colunas))
+            for indice, valor in enumerate(linha):
+                total[indice] += valor
+        df = pd.DataFrame.from_dict(meses, orient='index', columns=self.colunas).sort_index()
+        if preencher_meses and not df.empty:
+            df = df.reindex(pd.period_range(df.index[0], df.index[-1], freq='M').strftime('%Y-%m'), fill_value=0.0)
+        df.index.name = 'Mês'
+        return df
+
+
+def proventos_mensais(df_direitos, hoje=None):
+    """Recebidos (pagamento antes de hoje) e previstos por mês de pagamento, a partir dos direitos."""
+    hoje = hoje or date.today()
+    agregado = AgregadoMensal(COLUNAS_PROVENTOS_MENSAIS)
+    if df_direitos.empty:
+        return agregado
+    for ticker, data_pagamento, total in zip(df_direitos["Ativo"], df_direitos["Data Pagamento"], df_direitos["Total a Receber (R$)"]):
+        if total > 0 and isinstance(data_pagamento, date):
+            agregado.acrescentar(data_pagamento, ticker, "Recebidos" if data_pagamento < hoje else "Previstos", total)
+    return agregado
@@ -0,0 +1,280 @@
+import json
+import math
+import os
+import threading
+from bisect import bisect_right
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from backend.caminhos import caminho_dados
+from backend.cambio import serie_cambio
+from backend.diario import gravar_atomico
+from backend.historico_precos import armazem_precos
+
+CAMINHO_ANALISE = caminho_dados('estado_analise.json')
+COLUNAS_ANALISE = ["Ativo", "TWR (%)", "XIRR (% a.a.)", "Volatilidade (% a.a.)", "Drawdown Máx. (%)", "Drawdown Atual (%)"]
+LINHA_CARTEIRA = "Carteira"
+
+
+def xirr(fluxos, palpite=0.1, iteracoes=100, tolerancia=1e-9):
+    """Taxa interna de retorno anual de fluxos [(data, valor)] irregulares; None sem solução.
+
+    Newton a partir de `palpite` (o resultado anterior, quando existe) e bisseção como recurso.
+    """
+    if not fluxos:
+        return None
+    datas = pd.to_datetime([d for d, _ in fluxos])
+    valores = np.array([v for _, v in fluxos], dtype=float)
+    if not (valores > 0).any() or not (valores < 0).any():
+        return None
+    anos = ((datas - datas.min()).days / 365.0).to_numpy()
+
+    def vpl(taxa):
+        with np.errstate(over='ignore', divide='ignore'):
+            return float(np.sum(valores / (1 + taxa) ** anos))
+
+    taxa = palpite if palpite is not None and palpite > -0.99 else 0.1
+    with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+        for _ in range(iteracoes):
+            fator = (1 + taxa) ** anos
+            f = np.sum(valores / fator)
+            derivada = np.sum(-anos * valores / (fator * (1 + taxa)))
+            if derivada == 0 or not np.isfinite(derivada):
+                break
+            nova = taxa - f / derivada
+            if not np.isfinite(nova) or nova <= -0.9999:
+                break
+            if abs(nova - taxa) < tolerancia:
+                return float(nova)
+            taxa = nova
+
+    baixo, alto = -0.9999, 100.0
+    if vpl(baixo) * vpl(alto) > 0:
+        return None
+    for _ in range(200):
+        meio = (baixo + alto) / 2
+        if vpl(baixo) * vpl(meio) <= 0:
+            alto = meio
+        else:
+            baixo = meio
+        if alto - baixo < tolerancia:
+            break
+    return (baixo + alto) / 2
+
+
+class Acumulador:
+    """Retorno ponderado pelo tempo, volatilidade e drawdown de uma série, um ponto de cada vez.
+
+    Cada ponto novo só atualiza somas (log-retorno acumulado, média e M2 de Welford, pico),
+    pelo que o custo não cresce com o tamanho do histórico.
+    """
+
+    CAMPOS = ("primeira_data", "ultima_data", "ultimo_valor", "observacoes", "n", "media", "m2", "log_retorno", "pico_log", "max_drawdown")
+
+    def __init__(self, **estado):
+        self.primeira_data = None
+        self.ultima_data = None
+        self.ultimo_valor = None
+        self.observacoes = 0
+        self.n = 0
+        self.media = 0.0
+        self.m2 = 0.0
+        self.log_retorno = 0.0
+        self.pico_log = 0.0
+        self.max_drawdown = 0.0
+        for campo, valor in estado.items():
+            if campo in self.CAMPOS:
+                setattr(self, campo, valor)
+
+    def para_dict(self):
+        return {campo: getattr(self, campo) for campo in self.CAMPOS}
+
+    def acrescentar(self, data, valor, fluxo=0.0):
+        """Junta o valor de `data`; `fluxo` é o dinheiro que entrou desde o ponto anterior."""
+        valor = float(valor)
+        if self.ultimo_valor and self.ultimo_valor > 0 and math.isfinite(valor):
+            retorno = (valor - fluxo) / self.ultimo_valor - 1
+            if retorno > -1:
+                self.n += 1
+                delta = retorno - self.media
+                self.media += delta / self.n
+                self.m2 += delta * (retorno - self.media)
+                self.log_retorno += math.log1p(retorno)
+                self.pico_log = max(self.pico_log, self.log_retorno)
+                self.max_drawdown = max(self.max_drawdown, 1 - math.exp(self.log_retorno - self.pico_log))
+        if self.primeira_data is None:
+            self.primeira_data = data
+        self.ultima_data = data
+        self.ultimo_valor = valor
+        self.observacoes += 1
+
+    def metricas(self):
+        """TWR acumulado, volatilidade anualizada e drawdowns, em %."""
+        volatilidade = None
+        if self.n > 1:
+            dias = (date.fromisoformat(self.ultima_data) - date.fromisoformat(self.primeira_data)).days
+            periodos_por_ano = 365.25 * self.n / dias if dias > 0 else 252
+            volatilidade = math.sqrt(self.m2 / (self.n - 1)) * math.sqrt(periodos_por_ano) * 100
+        return {
+            "TWR (%)": math.expm1(self.log_retorno) * 100,
+            "Volatilidade (% a.a.)": volatilidade,
+            "Drawdown Máx. (%)": self.max_drawdown * 100,
+            "Drawdown Atual (%)": (1 - math.exp(self.log_retorno - self.pico_log)) * 100,
+        }
+
+
+def _fechos_locais(ticker):
+    """Fechos já guardados no armazém de preços (sem ir à rede), na moeda de origem."""
+    df = armazem_precos().carregar(ticker)
+    return df['Close'].dropna() if not df.empty and 'Close' in df.columns else pd.Series(dtype=float)
+
+
+class AnaliseRentabilidade:
+    """TWR, XIRR, volatilidade e drawdown da carteira e de cada ativo, mantidos de forma incremental.
+
+    A carteira usa os snapshots diários do histórico com os aportes como fluxos; cada ativo
+    usa os fechos do armazém de preços desde a primeira compra (só dias já encerrados).
+    O estado fica em `estado_analise.json` e só os pontos novos são processados; se o
+    passado mudar (compra com data antiga, histórico reescrito), a série é refeita.
+    """
+
+    def __init__(self, caminho=CAMINHO_ANALISE):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._estado = self._carregar()
+
+    def _carregar(self):
+        if not os.path.exists(self.caminho): return {}
+        try:
+            with open(self.caminho, 'r', encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except (OSError, json.JSONDecodeError): return {}
+
+    def _gravar(self):
+        gravar_atomico(self.caminho, json.dumps(self._estado))
+
+    def _atualizar_carteira(self, historico, aportes):
+        """Junta os snapshots novos; devolve True se o estado mudou."""
+        if historico.empty:
+            return False
+        historico = historico.sort_values('Data')
+        datas = historico['Data'].astype(str).tolist()
+        valores = historico['ValorTotal'].astype(float).tolist()
+        por_data = {}
+        for aporte in aportes:
+            por_data[aporte["Data"]] = por_data.get(aporte["Data"], 0.0) + aporte["Valor do Aporte"]
+        acumulado = np.cumsum([por_data[d] for d in sorted(por_data)]) if por_data else np.array([])
+        datas_unicas = sorted(por_data)
+
+        def aportado_ate(data):
+            posicao = bisect_right(datas_unicas, data)
+            return float(acumulado[posicao - 1]) if posicao > 0 else 0.0
+
+        estado = self._estado.get("carteira")
+        acumulador = Acumulador(**estado["acumulador"]) if estado else None
+        if acumulador is not None:
+            inicio = bisect_right(datas, acumulador.ultima_data)
+            valido = (
+                inicio == acumulador.observacoes
+                and math.isclose(valores[inicio - 1], acumulador.ultimo_valor)
+                and math.isclose(aportado_ate(acumulador.ultima_data), estado["aportado"])
+            )
+            if not valido:
+                acumulador = None
+        if acumulador is None:
+            acumulador, inicio = Acumulador(), 0
+        elif inicio == len(datas):
+            return False
+
+        for data, valor in zip(datas[inicio:], valores[inicio:]):
+            fluxo = aportado_ate(data) - aportado_ate(acumulador.ultima_data) if acumulador.ultima_data else 0.0
+            acumulador.acrescentar(data, valor, fluxo)
+        self._estado["carteira"] = {"acumulador": acumulador.para_dict(), "aportado": aportado_ate(acumulador.ultima_data)}
+        return True
+
+    def _atualizar_ativos(self, inicios, hoje):
+        """Junta os fechos novos de cada ativo desde a primeira compra; devolve True se mudou.
+
+        Se o armazém passou a ter fechos anteriores ao primeiro dia do acumulador (backfill,
+        ou o atualizador a descarregar desde a primeira compra) ou dias que faltavam no meio,
+        a série do ativo é refeita. Só os fechos novos são convertidos para reais.
+        """
+        ativos = self._estado.setdefault("ativos", {})
+        cambio = serie_cambio()
+        inicios_usd = [inicio for ticker, inicio in inicios.items() if ticker.endswith('-USD')]
+        if inicios_usd and (cambio.origem is None or cambio.origem > date.fromisoformat(min(inicios_usd))):
+            cambio.atualizar(min(inicios_usd), hoje - timedelta(days=1))
+        mudou = False
+        for ticker, inicio in inicios.items():
+            fechos = _fechos_locais(ticker)
+            if ticker.endswith('-USD') and cambio.origem is not None:
+                # Sem câmbio não há preço em reais: a série começa no primeiro dia com taxa
+                inicio = max(inicio, cambio.origem.isoformat())
+            elif ticker.endswith('-USD'):
+                continue
+            indice = fechos.index
+            disponiveis = fechos.iloc[indice.searchsorted(pd.Timestamp(inicio)):indice.searchsorted(pd.Timestamp(hoje))]
+            if disponiveis.empty:
+                continue
+            estado = ativos.get(ticker)
+            acumulador = Acumulador(**estado["acumulador"]) if estado and estado["inicio"] == inicio else None
+            if acumulador is not None and acumulador.ultima_data:
+                primeira, ultima = pd.Timestamp(acumulador.primeira_data), pd.Timestamp(acumulador.ultima_data)
+                dias = disponiveis.index
+                conhecidos = dias.searchsorted(ultima, side='right') - dias.searchsorted(primeira)
+                if dias[0] < primeira or conhecidos != acumulador.observacoes:
+                    acumulador = None
+            if acumulador is None:
+                acumulador, novos = Acumulador(), disponiveis
+            else:
+                novos = disponiveis.iloc[disponiveis.index.searchsorted(pd.Timestamp(acumulador.ultima_data), side='right'):]
+                if novos.empty:
+                    continue
+            if ticker.endswith('-USD'):
+                novos = (novos * cambio.serie(novos.index)).dropna()
+            for dia, preco in novos.items():
+                acumulador.acrescentar(dia.strftime('%Y-%m-%d'), preco)
+            ativos[ticker] = {"inicio": inicio, "acumulador": acumulador.para_dict()}
+            mudou = True
+        return mudou
+
+    def calcular(self, historico, aportes, df_carteira, df_direitos, hoje=None):
+        """Quadro com uma linha para a carteira e uma por ativo (métricas em %)."""
+        hoje = hoje or date.today()
+        inicios = {}
+        for aporte in sorted(aportes, key=lambda a: a["Data"]):
+            inicios.setdefault(aporte["Ticker"], aporte["Data"])
+        with self._lock:
+            mudou = self._atualizar_carteira(historico, aportes)
+            mudou = self._atualizar_ativos(inicios, hoje) or mudou
+
+            valores_atuais = df_carteira.set_index("Ativo")["Valor Atual (R$)"] if not df_carteira.empty else pd.Series(dtype=float)
+            pagos = df_direitos[df_direitos["Status"] == "Pago"] if not df_direitos.empty else df_direitos
+            fluxos_por_ativo = {}
+            for aporte in aportes:
+                fluxos_por_ativo.setdefault(aporte["Ticker"], []).append((aporte["Data"], -aporte["Valor do Aporte"]))
+            for ticker, data_pagamento, valor in zip(pagos["Ativo"], pagos["Data Pagamento"], pagos["Total a Receber (R$)"]):
+                fluxos_por_ativo.setdefault(ticker, []).append((str(data_pagamento), valor))
+
+            palpites = self._estado.setdefault("xirr", {})
+            linhas = []
+            for nome in [LINHA_CARTEIRA] + list(valores_atuais.index):
+                if nome == LINHA_CARTEIRA:
+                    estado = self._estado.get("carteira")
+                    fluxos = [f for lista in fluxos_por_ativo.values() for f in lista]
+                    valor_atual = float(valores_atuais.sum())
+                else:
+                    estado = self._estado["ativos"].get(nome)
+                    fluxos = list(fluxos_por_ativo.get(nome, []))
+                    valor_atual = float(valores_atuais[nome])
+                fluxos.append((hoje.isoformat(), valor_atual))
+                taxa = xirr(fluxos, palpites.get(nome))
+                if taxa is not None:
+                    palpites[nome] = taxa
+                metricas = Acumulador(**estado["acumulador"]).metricas() if estado else {}
+                linhas.append({"Ativo": nome, **metricas, "XIRR (% a.a.)": taxa * 100 if taxa is not None else None})
+            if mudou:
+                self._gravar()
+        return pd.DataFrame(linhas, columns=COLUNAS_ANALISE)
@@ -0,0 +1,50 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.instrumentacao import instrumentacao, no_contexto_atual
+
+MAX_CONCORRENCIA = 8
+TIMEOUT_PADRAO = 60
+
+
+async def _executar_fonte(nome, funcao, argumentos, semaforo, pool, timeout):
+    async with semaforo:
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(pool, no_contexto_atual(funcao), *argumentos), timeout)
+        except asyncio.TimeoutError:
+            instrumentacao().contar(f"aquisicao.{nome}.tempo_esgotado")
+        except Exception:
+            instrumentacao().contar(f"aquisicao.{nome}.erros")
+        return None
+
+async def executar_fontes(fontes, max_concorrencia=MAX_CONCORRENCIA, timeout=TIMEOUT_PADRAO):
+    """Corre as fontes {nome: (função, *argumentos)} em simultâneo e devolve {nome: resultado}.
+
+    As funções bloqueantes (yfinance, requests) correm num pool de threads próprio;
+    o semáforo limita quantas estão em curso e cada uma tem o seu timeout. Uma fonte
+    que falha ou esgota o tempo devolve None sem afetar as outras.
+    """
+    semaforo = asyncio.Semaphore(max_concorrencia)
+    pool = ThreadPoolExecutor(max_workers=max_concorrencia)
+    try:
+        tarefas = [
+            _executar_fonte(nome, funcao, argumentos, semaforo, pool, timeout)
+            for nome, (funcao, *argumentos) in fontes.items()
+        ]
+        return dict(zip(fontes, await asyncio.gather(*tarefas)))
+    finally:
+        # Não espera pelas threads que esgotaram o tempo: terminam sozinhas em segundo plano
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def adquirir(fontes, max_concorrencia=MAX_CONCORRENCIA, timeout=TIMEOUT_PADRAO):
+    """Fachada síncrona de `executar_fontes` para a aplicação e os scripts."""
+    corrotina = executar_fontes(fontes, max_concorrencia, timeout)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(corrotina)
+    # Já existe um loop nesta thread (ex.: Jupyter): corre noutra thread
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(contextvars.copy_context().run, asyncio.run, corrotina).result()
@@ -0,0 +1,117 @@
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from backend.fundamentus import extrair_proventos_em_paralelo
+from backend.instrumentacao import instrumentacao
+from backend.repositorio import CHAVE_DIVIDENDOS as CHAVE, COLUNAS_DIVIDENDOS as COLUNAS, obter_repositorio
+
+IDADE_MAXIMA = timedelta(hours=12)
+# Um ticker cuja busca falhou só volta a ser tentado passado este tempo
+IDADE_MAXIMA_APOS_FALHA = timedelta(minutes=30)
+
+
+def _anti_join(esquerda, direita):
+    """Linhas de `esquerda` sem correspondente em `direita` (contando repetições)."""
+    esquerda = esquerda.assign(_ocorrencia=esquerda.groupby(COLUNAS, dropna=False).cumcount())
+    direita = direita.assign(_ocorrencia=direita.groupby(COLUNAS, dropna=False).cumcount())
+    juntas = esquerda.merge(direita, on=COLUNAS + ['_ocorrencia'], how='left', indicator=True)
+    return juntas[juntas['_merge'] == 'left_only'].drop(columns=['_merge', '_ocorrencia'])
+
+
+class ArmazemDividendos:
+    """Histórico local de proventos (chave Ativo, data_ex, Tipo) com sincronização incremental.
+
+    As falhas ficam registadas em memória, para que um ticker inacessível não seja
+    procurado de novo (com todas as retentativas) a cada chamada. `versao` muda sempre
+    que entram proventos novos.
+    """
+
+    def __init__(self, repositorio=None, extrair_varios=extrair_proventos_em_paralelo):
+        self.repositorio = repositorio or obter_repositorio()
+        self._extrair_varios = extrair_varios
+        self._lock = threading.Lock()
+        self._falhas = {}
+        self._em_segundo_plano = None
+        self.versao = 0
+
+    def carregar(self):
+        return self.repositorio.carregar_dividendos()
+
+    def proventos(self, tickers):
+        return self.repositorio.carregar_dividendos(tickers)
+
+    def tickers_desatualizados(self, tickers, idade_maxima=IDADE_MAXIMA, idade_apos_falha=IDADE_MAXIMA_APOS_FALHA):
+        ultima = self.repositorio.carregar_sincronizacao()
+        agora = datetime.now()
+        limite, limite_falha = agora - idade_maxima, agora - min(idade_maxima, idade_apos_falha)
+        with self._lock:
+            falhas = dict(self._falhas)
+        return [t for t in tickers if t.endswith('.SA')
+                and (t not in ultima or datetime.fromisoformat(ultima[t]) < limite)
+                and (t not in falhas or falhas[t] < limite_falha)]
+
+    def mesclar(self, novos):
+        """Substitui só os grupos (Ativo, data_ex, Tipo) novos ou alterados e grava.
+
+        Um mesmo grupo pode ter várias linhas (ex.: JCP pago em parcelas), por isso a
+        comparação é feita linha a linha dentro do grupo. Devolve quantas linhas entraram.
+        """
+        if novos.empty:
+            return 0
+        novos = novos.reindex(columns=COLUNAS)
+        existente = self.repositorio.carregar_dividendos(novos['Ativo'].unique()).reindex(columns=COLUNAS)
+        if existente.empty:
+            so_novos, so_existentes = novos, existente
+        else:
+            so_novos, so_existentes = _anti_join(novos, existente), _anti_join(existente, novos)
+        chaves_novas = pd.MultiIndex.from_frame(novos[CHAVE].astype(object))
+        chaves_alteradas = pd.MultiIndex.from_frame(so_novos[CHAVE].astype(object)).union(
+            pd.MultiIndex.from_frame(so_existentes[CHAVE].astype(object)).intersection(chaves_novas))
+        if chaves_alteradas.empty:
+            return 0
+        entram = novos[chaves_novas.isin(chaves_alteradas)]
+        self.repositorio.substituir_dividendos(chaves_alteradas.to_frame(index=False, name=CHAVE), entram)
+        return len(entram)
+
+    def sincronizar(self, tickers, idade_maxima=IDADE_MAXIMA):
+        """Busca no Fundamentus (em paralelo) só os tickers desatualizados e mescla as novidades."""
+        desatualizados = self.tickers_desatualizados(tickers, idade_maxima)
+        instrumentacao().contar("proventos.desatualizados", len(desatualizados))
+        if not desatualizados:
+            return 0
+        partes, atualizados = [], {}
+        with instrumentacao().medir("proventos.fundamentus", tickers=len(desatualizados)):
+            extraidos = self._extrair_varios(desatualizados)
+        agora = datetime.now()
+        with self._lock:
+            for ticker, df in extraidos.items():
+                if df is None:
+                    self._falhas[ticker] = agora
+                    continue
+                self._falhas.pop(ticker, None)
+                partes.append(df.assign(Ativo=ticker))
+                atualizados[ticker] = agora.isoformat(timespec='seconds')
+        novos = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=COLUNAS)
+        with instrumentacao().medir("proventos.mesclar"):
+            adicionados = self.mesclar(novos)
+        self.repositorio.gravar_sincronizacao(atualizados)
+        if adicionados:
+            with self._lock:
+                self.versao += 1
+        return adicionados
+
+    def sincronizar_em_segundo_plano(self, tickers, idade_maxima=IDADE_MAXIMA):
+        """Lança `sincronizar` numa thread (no máximo uma de cada vez) e volta de imediato."""
+        with self._lock:
+            if self._em_segundo_plano is not None and self._em_segundo_plano.is_alive():
+                return
+            self._em_segundo_plano = threading.Thread(target=self._sincronizar_sem_erros, args=(list(tickers), idade_maxima), daemon=True)
+            self._em_segundo_plano.start()
+
+    def _sincronizar_sem_erros(self, tickers, idade_maxima):
+        try:
+            self.sincronizar(tickers, idade_maxima)
+        except Exception:
+            instrumentacao().contar("proventos.erros_segundo_plano")
@@ -0,0 +1,4 @@
+def categorizar_ativo(ticker):
+    if "-USD" in ticker: return "Criptomoeda"
+    elif "11.SA" in ticker: return "ETF"
+    else: return "Ação"
@@ -0,0 +1,129 @@
+import json
+import os
+import threading
+import time
+from datetime import timedelta
+
+from backend.ativos import categorizar_ativo
+from backend.caminhos import caminho_dados
+from backend.cambio import serie_cambio
+from backend.cotacoes import buscar_cotacoes_em_lote, converter_para_reais
+from backend.diario import gravar_atomico
+from backend.instrumentacao import instrumentacao
+
+CAMINHO_CACHE = caminho_dados('cache_cotacoes.json')
+
+# Validade (em segundos) de uma cotação por classe de ativo
+TTL_POR_CLASSE = {
+    "Criptomoeda": 60,
+    "Ação": 900,
+    "ETF": 900,
+}
+TTL_PADRAO = 900
+
+
+class CacheCotacoes:
+    """Cache de cotações com TTL por classe, gravado em disco e com stale-while-revalidate.
+
+    Uma cotação expirada continua a ser devolvida de imediato enquanto uma thread
+    em segundo plano a atualiza; só os tickers sem qualquer cotação esperam pela rede.
+    """
+
+    def __init__(self, caminho=CAMINHO_CACHE, ttl_por_classe=None, buscar=buscar_cotacoes_em_lote):
+        self.caminho = caminho
+        self.ttl_por_classe = {**TTL_POR_CLASSE, **(ttl_por_classe or {})}
+        self._buscar = buscar
+        self._lock = threading.Lock()
+        self._em_atualizacao = set()
+        self._entradas = self._carregar()
+        # Muda sempre que entram cotações novas (ver `geracao`)
+        self.versao = 0
+
+    def _carregar(self):
+        if not os.path.exists(self.caminho): return {}
+        try:
+            with open(self.caminho, 'r', encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except (OSError, json.JSONDecodeError): return {}
+
+    def _gravar(self):
+        with self._lock:
+            conteudo = json.dumps(self._entradas)
+        gravar_atomico(self.caminho, conteudo)
+
+    def ttl(self, ticker):
+        return self.ttl_por_classe.get(categorizar_ativo(ticker), TTL_PADRAO)
+
+    def idade_maxima(self, tickers):
+        """Menor validade entre as classes de `tickers` (quanto um preço calculado pode ter)."""
+        return timedelta(seconds=min((self.ttl(t) for t in tickers), default=TTL_PADRAO))
+
+    def _atualizar(self, tickers):
+        try:
+            cotacoes = self._buscar(tickers)
+            agora = time.time()
+            with self._lock:
+                for ticker, cotacao in cotacoes.items():
+                    if cotacao is not None:
+                        self._entradas[ticker] = {"cotacao": float(cotacao), "atualizado_em": agora}
+                self.versao += 1
+            self._gravar()
+        finally:
+            with self._lock:
+                self._em_atualizacao.difference_update(tickers)
+
+    def _atualizar_em_segundo_plano(self, tickers):
+        with self._lock:
+            tickers = [t for t in tickers if t not in self._em_atualizacao]
+            self._em_atualizacao.update(tickers)
+        if tickers:
+            threading.Thread(target=self._atualizar, args=(tickers,), daemon=True).start()
+
+    def obter(self, tickers):
+        """Devolve {ticker: cotação na moeda de origem}, buscando na rede só o que falta."""
+        agora = time.time()
+        em_falta, expirados = [], []
+        with self._lock:
+            for ticker in tickers:
+                entrada = self._entradas.get(ticker)
+                if entrada is None:
+                    em_falta.append(ticker)
+                elif agora - entrada["atualizado_em"] > self.ttl(ticker):
+                    expirados.append(ticker)
+            if em_falta:
+                self._em_atualizacao.update(em_falta)
+        instrumentacao().contar("cache_cotacoes.acertos", len(tickers) - len(em_falta) - len(expirados))
+        instrumentacao().contar("cache_cotacoes.falhas", len(em_falta))
+        instrumentacao().contar("cache_cotacoes.expirados", len(expirados))
+        if em_falta:
+            with instrumentacao().medir("cache_cotacoes.buscar", tickers=len(em_falta)):
+                self._atualizar(em_falta)
+        if expirados:
+            self._atualizar_em_segundo_plano(expirados)
+        with self._lock:
+            return {t: self._entradas[t]["cotacao"] if t in self._entradas else None for t in tickers}
+
+    def geracao(self, tickers):
+        """Identifica as cotações e a taxa do dólar que `obter_precos` devolveria agora.
+
+        Como em `obter`, as cotações expiradas são pedidas em segundo plano; quando chegam,
+        a geração muda e quem guardou resultados com a anterior volta a calcular.
+        """
+        agora = time.time()
+        with self._lock:
+            expirados = [t for t in tickers if t in self._entradas and agora - self._entradas[t]["atualizado_em"] > self.ttl(t)]
+        if expirados:
+            self._atualizar_em_segundo_plano(expirados)
+        taxa_dolar = self.taxa_dolar() if any("-USD" in t for t in tickers) else None
+        return (self.versao, taxa_dolar)
+
+    def obter_precos(self, tickers):
+        """Preços em reais; a taxa do dólar vem da série de câmbio local."""
+        tickers = list(tickers)
+        cotacoes = self.obter(tickers)
+        taxa_dolar = self.taxa_dolar() if any("-USD" in t for t in tickers) else None
+        return converter_para_reais(cotacoes, taxa_dolar)
+
+    def taxa_dolar(self):
+        """Última taxa conhecida; a série de câmbio renova-se em segundo plano (stale-while-revalidate)."""
+        return serie_cambio().taxa_recente()
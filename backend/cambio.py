@@ -0,0 +1,136 @@
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from backend.historico_precos import armazem_precos
+from backend.instrumentacao import instrumentacao
+
+TICKER_DOLAR = "BRL=X"
+# Histórico descarregado na primeira utilização, quando não é pedido um início
+DIAS_HISTORICO_INICIAL = 30
+# Intervalo mínimo (segundos) entre atualizações da cotação de hoje
+INTERVALO_ATUALIZACAO = 300
+
+
+def _dia(valor):
+    return valor if type(valor) is date else pd.Timestamp(valor).date()
+
+class SerieCambio:
+    """Série diária de câmbio (reais por dólar), guardada no armazém de preços.
+
+    A série é densa (dias sem cotação herdam a anterior) e indexada pelo número de dias
+    desde a primeira data, pelo que `taxa_em` é O(1) e `converter` multiplica uma matriz
+    inteira de preços de uma só vez. A origem e as taxas são trocadas juntas, para que
+    quem lê durante uma atualização em segundo plano veja sempre uma série coerente.
+    """
+
+    def __init__(self, ticker=TICKER_DOLAR, armazem=None, intervalo_atualizacao=INTERVALO_ATUALIZACAO):
+        self.ticker = ticker
+        self.armazem = armazem or armazem_precos()
+        self.intervalo_atualizacao = intervalo_atualizacao
+        self._lock = threading.Lock()
+        self._atualizado_em = 0.0
+        self._em_segundo_plano = None
+        self.ultimo_erro = None
+        self._estado = (None, np.empty(0))
+        self._reconstruir()
+
+    def _reconstruir(self):
+        df = self.armazem.carregar(self.ticker)
+        fechos = df['Close'].dropna() if 'Close' in df.columns else pd.Series(dtype=float)
+        if fechos.empty:
+            self._estado = (None, np.empty(0))
+            return
+        dias = pd.date_range(fechos.index.min(), fechos.index.max())
+        self._estado = (fechos.index.min().date(), fechos.reindex(dias).ffill().to_numpy(dtype=float))
+
+    @property
+    def origem(self):
+        """Primeiro dia da série (None se ainda não houver taxas)."""
+        return self._estado[0]
+
+    def atualizar(self, inicio=None, fim=None):
+        """Descarrega só os dias em falta; a cotação de hoje é renovada no máximo a cada intervalo."""
+        fim = _dia(fim or date.today())
+        inicio = _dia(inicio) if inicio else (self.origem or fim - timedelta(days=DIAS_HISTORICO_INICIAL))
+        with self._lock:
+            inclui_hoje = fim >= date.today()
+            if inclui_hoje and time.time() - self._atualizado_em < self.intervalo_atualizacao and self._cobre(inicio):
+                instrumentacao().contar("cambio.acertos")
+                return self
+            instrumentacao().contar("cambio.falhas")
+            try:
+                with instrumentacao().medir("cambio.atualizar"):
+                    self.armazem.atualizar([self.ticker], inicio, fim)
+                self.ultimo_erro = None
+            except Exception as e:
+                instrumentacao().contar("cambio.erros")
+                self.ultimo_erro = f"{type(e).__name__}: {e}"
+            if inclui_hoje:
+                self._atualizado_em = time.time()
+            self._reconstruir()
+        return self
+
+    def _cobre(self, inicio):
+        return self.origem is not None and self.origem <= inicio
+
+    def taxa_em(self, data):
+        """Taxa do dia (ou a última conhecida antes dele); None antes do início da série."""
+        origem, taxas = self._estado
+        if origem is None:
+            return None
+        indice = (_dia(data) - origem).days
+        if indice < 0:
+            return None
+        return float(taxas[min(indice, len(taxas) - 1)])
+
+    def taxa_atual(self):
+        """Taxa de hoje, atualizando a série se for preciso (a última conhecida se a rede falhar)."""
+        return self.atualizar().taxa_em(date.today())
+
+    def taxa_recente(self):
+        """Última taxa conhecida, de imediato; se estiver desatualizada, a série é renovada numa thread.
+
+        Só espera pela rede quando ainda não há nenhuma taxa (primeira utilização).
+        """
+        if self.origem is None:
+            return self.taxa_atual()
+        if time.time() - self._atualizado_em >= self.intervalo_atualizacao:
+            with self._lock:
+                if self._em_segundo_plano is None or not self._em_segundo_plano.is_alive():
+                    self._em_segundo_plano = threading.Thread(target=self.atualizar, daemon=True)
+                    self._em_segundo_plano.start()
+        return self.taxa_em(date.today())
+
+    def serie(self, dias):
+        """Taxas alinhadas com `dias` (vetorizado); NaN antes do início da série."""
+        dias = pd.DatetimeIndex(dias)
+        origem, taxas = self._estado
+        if origem is None:
+            return pd.Series(np.nan, index=dias)
+        indices = ((dias - pd.Timestamp(origem)).days).to_numpy()
+        valores = taxas[np.clip(indices, 0, len(taxas) - 1)]
+        return pd.Series(np.where(indices >= 0, valores, np.nan), index=dias)
+
+    def converter(self, precos):
+        """Converte para reais as colunas '-USD' de uma matriz datas × tickers, numa única multiplicação."""
+        colunas_usd = [c for c in precos.columns if c.endswith('-USD')]
+        if not colunas_usd:
+            return precos
+        precos = precos.copy()
+        precos[colunas_usd] = precos[colunas_usd].mul(self.serie(precos.index), axis=0)
+        return precos
+
+
+_serie = None
+
+
+def serie_cambio():
+    """Série do dólar partilhada pela aplicação e pelos scripts."""
+    global _serie
+    if _serie is None:
+        _serie = SerieCambio()
+    return _serie
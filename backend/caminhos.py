@@ -0,0 +1,9 @@
+import os
+
+# --- Lógica de Caminhos Robusta ---
+project_root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+# KINVO_DADOS permite usar outra pasta de dados (ex.: dados sintéticos nos benchmarks)
+data_folder_path = os.environ.get("KINVO_DADOS", os.path.join(project_root, 'data'))
+
+def caminho_dados(*partes):
+    return os.path.join(data_folder_path, *partes)
@@ -0,0 +1,101 @@
+import json
+import os
+from bisect import bisect_left
+
+from backend.ativos import categorizar_ativo
+from backend.caminhos import caminho_dados
+from backend.diario import gravar_atomico
+
+CAMINHO_CATALOGO = caminho_dados('catalogo_tickers.json')
+ATIVOS_MANUAIS = ["IVVB11.SA", "GOLD11.SA", "SMAL11.SA", "BOVA11.SA"]
+ATIVOS_PADRAO = ["BTC-USD", "ETH-USD", "PETR4.SA", "VALE3.SA", "ITUB4.SA", "GOLD11.SA"]
+CODIGOS_CLASSE = {"Ação": "A", "ETF": "E", "Criptomoeda": "C"}
+CLASSES_POR_CODIGO = {codigo: classe for classe, codigo in CODIGOS_CLASSE.items()}
+
+
+def _trigramas(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class CatalogoTickers:
+    """Lista ordenada de tickers com a classe de cada um e um índice de trigramas.
+
+    Prefixos são resolvidos por pesquisa binária na lista ordenada; termos que
+    aparecem no meio do ticker usam a interseção das listas de trigramas.
+    """
+
+    def __init__(self, tickers, classes, trigramas=None):
+        self.tickers = tickers
+        self.classes = classes
+        self.trigramas = trigramas if trigramas is not None else self._indexar(tickers)
+
+    @staticmethod
+    def _indexar(tickers):
+        indice = {}
+        for posicao, ticker in enumerate(tickers):
+            for trigrama in _trigramas(ticker):
+                indice.setdefault(trigrama, []).append(posicao)
+        return indice
+
+    @classmethod
+    def construir(cls, lista_de_tickers):
+        tickers = sorted({t.upper() for t in lista_de_tickers})
+        classes = "".join(CODIGOS_CLASSE[categorizar_ativo(t)] for t in tickers)
+        return cls(tickers, classes)
+
+    @classmethod
+    def de_dados(cls, dados):
+        """Catálogo a partir da estrutura de all_tickers.json (ou da lista padrão, se vazia)."""
+        if not dados:
+            return cls.construir(ATIVOS_PADRAO)
+        return cls.construir(dados.get("acoes_b3", []) + dados.get("criptomoedas", []) + dados.get("etfs", []) + ATIVOS_MANUAIS)
+
+    def gravar(self, caminho=CAMINHO_CATALOGO):
+        gravar_atomico(caminho, json.dumps(
+            {"tickers": self.tickers, "classes": self.classes, "trigramas": self.trigramas},
+            separators=(',', ':')))
+
+    @classmethod
+    def carregar(cls, caminho=CAMINHO_CATALOGO):
+        if not os.path.exists(caminho): return None
+        try:
+            with open(caminho, 'r', encoding='utf-8') as arquivo:
+                dados = json.load(arquivo)
+        except (OSError, json.JSONDecodeError): return None
+        return cls(dados["tickers"], dados["classes"], dados.get("trigramas"))
+
+    def classe(self, ticker):
+        posicao = bisect_left(self.tickers, ticker)
+        if posicao < len(self.tickers) and self.tickers[posicao] == ticker:
+            return CLASSES_POR_CODIGO[self.classes[posicao]]
+        return categorizar_ativo(ticker)
+
+    def __contains__(self, ticker):
+        posicao = bisect_left(self.tickers, ticker)
+        return posicao < len(self.tickers) and self.tickers[posicao] == ticker
+
+    def pesquisar(self, termo, limite=50):
+        """Até `limite` tickers: primeiro os que começam pelo termo, depois os que o contêm."""
+        termo = (termo or "").strip().upper()
+        inicio = bisect_left(self.tickers, termo)
+        resultado = []
+        for ticker in self.tickers[inicio:]:
+            if len(resultado) >= limite or not ticker.startswith(termo):
+                break
+            resultado.append(ticker)
+        if len(resultado) >= limite or len(termo) < 3:
+            return resultado
+        candidatos = None
+        for trigrama in _trigramas(termo):
+            posicoes = set(self.trigramas.get(trigrama, ()))
+            candidatos = posicoes if candidatos is None else candidatos & posicoes
+            if not candidatos:
+                return resultado
+        ja_incluidos = set(resultado)
+        for posicao in sorted(candidatos):
+            ticker = self.tickers[posicao]
+            if termo in ticker and ticker not in ja_incluidos:
+                resultado.append(ticker)
+                if len(resultado) >= limite:
+                    break
+        return resultado
@@ -0,0 +1,84 @@
+import pandas as pd
+import yfinance as yf
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from backend.aquisicao import adquirir
+from backend.cambio import serie_cambio
+from backend.historico_precos import armazem_precos
+from backend.instrumentacao import instrumentacao, no_contexto_atual
+
+MAX_WORKERS_PADRAO = 8
+
+
+def buscar_cotacao_ativo(ticker_symbol):
+    """Cotação na moeda de origem (USD para criptomoedas, BRL para ativos da B3)."""
+    try:
+        with instrumentacao().medir_ticker("yfinance", ticker_symbol):
+            ticker = yf.Ticker(ticker_symbol)
+            if "-USD" in ticker_symbol:
+                return ticker.info.get('regularMarketPrice')
+            else:
+                return ticker.history(period='1d')['Close'].iloc[-1]
+    except Exception:
+        instrumentacao().contar("cotacoes.falhas")
+        return None
+
+def _download_em_lote(tickers):
+    """Último fecho de vários tickers num único pedido, via armazém de preços local."""
+    if not tickers:
+        return {}
+    hoje = date.today()
+    try:
+        with instrumentacao().medir("cotacoes.lote_b3", tickers=len(tickers)):
+            dados = armazem_precos().fechos(tickers, hoje - timedelta(days=7), hoje)
+    except Exception:
+        return {}
+    if dados.empty:
+        return {}
+    ultimos = dados.ffill().iloc[-1]
+    return {ticker: float(preco) for ticker, preco in ultimos.items() if pd.notna(preco)}
+
+def buscar_cotacoes_em_lote(tickers, max_workers=MAX_WORKERS_PADRAO):
+    """Busca as cotações de todos os tickers de uma vez e devolve {ticker: cotação}.
+
+    Os tickers da B3 seguem num único download; os restantes (e os que o download
+    não devolveu) são pedidos em paralelo num pool de threads limitado.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    instrumentacao().contar("cotacoes.pedidas", len(tickers))
+    tickers_b3 = [t for t in tickers if t.endswith('.SA')]
+    outros = [t for t in tickers if not t.endswith('.SA')]
+
+    buscar = no_contexto_atual(buscar_cotacao_ativo)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futuros = {t: pool.submit(buscar, t) for t in outros}
+        cotacoes = _download_em_lote(tickers_b3)
+        for t in tickers_b3:
+            if t not in cotacoes:
+                futuros[t] = pool.submit(buscar, t)
+        for t, futuro in futuros.items():
+            cotacoes[t] = futuro.result()
+    return {t: cotacoes.get(t) for t in tickers}
+
+def converter_para_reais(cotacoes, taxa_dolar):
+    """Converte as cotações em USD (tickers '-USD') para reais."""
+    precos = {}
+    for ticker, cotacao in cotacoes.items():
+        if "-USD" in ticker:
+            precos[ticker] = cotacao * taxa_dolar if cotacao and taxa_dolar else None
+        else:
+            precos[ticker] = cotacao
+    return precos
+
+def buscar_precos_em_lote(tickers, max_workers=MAX_WORKERS_PADRAO):
+    """Preços em reais para todos os tickers; a taxa do dólar vem da série de câmbio local.
+
+    As cotações e o câmbio são fontes diferentes: pedem-se em simultâneo.
+    """
+    tickers = list(tickers)
+    fontes = {"cotacoes": (buscar_cotacoes_em_lote, tickers, max_workers)}
+    if any("-USD" in t for t in tickers):
+        fontes["cambio"] = (serie_cambio().taxa_atual,)
+    fontes = adquirir(fontes)
+    return converter_para_reais(fontes["cotacoes"] or {t: None for t in tickers}, fontes.get("cambio"))
@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import tempfile
+from collections import Counter
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import pandas as pd
+
+LIMITE_COMPACTACAO = 50
+
+
+def gravar_atomico(caminho, conteudo):
+    """Grava o ficheiro inteiro num temporário e troca-o de uma vez (nunca fica a meio)."""
+    pasta = os.path.dirname(caminho) or '.'
+    os.makedirs(pasta, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=pasta, suffix='.tmp')
+    try:
+        if isinstance(conteudo, bytes):
+            arquivo = os.fdopen(descritor, 'wb')
+        else:
+            arquivo = os.fdopen(descritor, 'w', encoding='utf-8', newline='')
+        with arquivo:
+            arquivo.write(conteudo)
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+@contextmanager
+def bloqueio_de_ficheiro(caminho):
+    """Bloqueio exclusivo entre processos (aplicação, atualizador, scripts) sobre `caminho`."""
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+    with open(caminho, 'a+b') as arquivo:
+        if fcntl is not None:
+            fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX)
+        else:
+            arquivo.seek(0)
+            msvcrt.locking(arquivo.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(arquivo.fileno(), fcntl.LOCK_UN)
+            else:
+                arquivo.seek(0)
+                msvcrt.locking(arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+def acrescentar_linha(caminho, linha):
+    """Acrescenta uma linha ao fim do ficheiro e força a escrita em disco."""
+    with open(caminho, 'a+b') as arquivo:
+        arquivo.seek(0, os.SEEK_END)
+        prefixo = b''
+        if arquivo.tell() > 0:
+            arquivo.seek(-1, os.SEEK_END)
+            if arquivo.read(1) != b'\n':
+                prefixo = b'\n'
+        arquivo.write(prefixo + linha.encode('utf-8') + b'\n')
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+
+def ultima_linha(caminho, bloco=4096):
+    """Última linha não vazia do ficheiro, lendo só o fim."""
+    with open(caminho, 'rb') as arquivo:
+        arquivo.seek(0, os.SEEK_END)
+        tamanho = arquivo.tell()
+        arquivo.seek(max(0, tamanho - bloco))
+        linhas = [l for l in arquivo.read().splitlines() if l.strip()]
+    return linhas[-1].decode('utf-8') if linhas else None
+
+
+# --- Histórico de património (CSV só de acréscimo) ---
+def registar_snapshot(caminho, data, valor_total):
+    """Acrescenta o valor do dia se ainda não existir; devolve True se escreveu."""
+    if not os.path.exists(caminho) or os.path.getsize(caminho) == 0:
+        gravar_atomico(caminho, f"Data,ValorTotal\n{data},{valor_total}\n")
+        return True
+    ultima_data = (ultima_linha(caminho) or '').split(',')[0]
+    if ultima_data != 'Data' and ultima_data >= data:
+        return False
+    acrescentar_linha(caminho, f"{data},{valor_total}")
+    return True
+
+def compactar_historico(caminho, novos=None):
+    """Junta linhas novas, remove datas repetidas (fica a última) e reescreve ordenado."""
+    partes = []
+    if os.path.exists(caminho) and os.path.getsize(caminho) > 0:
+        partes.append(pd.read_csv(caminho))
+    if novos is not None and not novos.empty:
+        partes.append(novos)
+    if not partes:
+        return pd.DataFrame(columns=['Data', 'ValorTotal'])
+    df = pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0]
+    df = df.drop_duplicates(subset='Data', keep='last').sort_values(by='Data')
+    gravar_atomico(caminho, df.to_csv(index=False))
+    return df
+
+
+# --- Carteira: carteira.json + diário de transações ---
+def _hash(caminho):
+    if not os.path.exists(caminho): return None
+    with open(caminho, 'rb') as arquivo:
+        return hashlib.sha256(arquivo.read()).hexdigest()
+
+def _chave(transacao):
+    return json.dumps(transacao, sort_keys=True)
+
+
+class DiarioCarteira:
+    """Carteira guardada como `carteira.json` (base) mais um diário JSON Lines de compras.
+
+    Cada compra nova é uma linha acrescentada ao diário; de `limite_compactacao` em
+    `limite_compactacao` linhas o diário é incorporado na base com uma escrita atómica.
+    A primeira linha do diário guarda o hash da base a que se aplica: se a base mudou
+    (compactação interrompida ou edição manual), só se reaplicam as transações que a
+    base ainda não contém.
+    """
+
+    def __init__(self, caminho, caminho_diario=None, limite_compactacao=LIMITE_COMPACTACAO):
+        self.caminho = caminho
+        self.caminho_diario = caminho_diario or os.path.splitext(caminho)[0] + '.jsonl'
+        self.limite_compactacao = limite_compactacao
+
+    def _carregar_base(self):
+        if not os.path.exists(self.caminho): return {}
+        try:
+            with open(self.caminho, 'r', encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except (FileNotFoundError, json.JSONDecodeError): return {}
+
+    def _ler_diario(self):
+        """(hash da base, [(ticker, transacao)]); ignora uma última linha incompleta."""
+        if not os.path.exists(self.caminho_diario): return None, []
+        hash_base, entradas = None, []
+        with open(self.caminho_diario, 'r', encoding='utf-8') as arquivo:
+            for linha in arquivo:
+                try:
+                    registo = json.loads(linha)
+                except json.JSONDecodeError:
+                    continue
+                if 'base' in registo:
+                    hash_base = registo['base']
+                else:
+                    entradas.append((registo['ticker'], registo['transacao']))
+        return hash_base, entradas
+
+    def carregar(self):
+        carteira = self._carregar_base()
+        hash_base, entradas = self._ler_diario()
+        if entradas and hash_base != _hash(self.caminho):
+            existentes = {ticker: Counter(_chave(t) for t in transacoes) for ticker, transacoes in carteira.items()}
+            pendentes = []
+            for ticker, transacao in entradas:
+                contador = existentes.get(ticker, Counter())
+                if contador[_chave(transacao)] > 0:
+                    contador[_chave(transacao)] -= 1
+                else:
+                    pendentes.append((ticker, transacao))
+            entradas = pendentes
+        for ticker, transacao in entradas:
+            carteira.setdefault(ticker, []).append(transacao)
+        return carteira
+
+    def versao(self):
+        """Muda sempre que a base ou o diário mudam."""
+        return tuple(
+            (os.path.getmtime(c), os.path.getsize(c)) if os.path.exists(c) else None
+            for c in (self.caminho, self.caminho_diario)
+        )
+
+    def adicionar(self, ticker, transacao):
+        if not os.path.exists(self.caminho_diario) or os.path.getsize(self.caminho_diario) == 0:
+            gravar_atomico(self.caminho_diario, json.dumps({"base": _hash(self.caminho)}) + '\n')
+        acrescentar_linha(self.caminho_diario, json.dumps({"ticker": ticker, "transacao": transacao}))
+        _, entradas = self._ler_diario()
+        if len(entradas) >= self.limite_compactacao:
+            self.compactar()
+
+    def compactar(self):
+        """Incorpora o diário em carteira.json (escrita atómica) e esvazia o diário."""
+        carteira = self.carregar()
+        gravar_atomico(self.caminho, json.dumps(carteira, indent=4))
+        if os.path.exists(self.caminho_diario):
+            os.remove(self.caminho_diario)
+        return carteira
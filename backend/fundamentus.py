@@ -0,0 +1,45 @@
+import os
+
+from backend.html_fundamentus import COLUNAS_PROVENTOS, ler_papeis, ler_proventos
+from backend.instrumentacao import instrumentacao
+from backend.rede import ClienteHTTP, ErroDeRede
+
+# Pode apontar para um servidor local (ex.: nos benchmarks, com FUNDAMENTUS_RPS mais alto)
+URL_BASE = os.environ.get("FUNDAMENTUS_URL", "https://www.fundamentus.com.br")
+URL_PROVENTOS = URL_BASE + "/proventos.php?papel={papel}"
+URL_RESULTADO = URL_BASE + "/resultado.php"
+REQUISICOES_POR_SEGUNDO = float(os.environ.get("FUNDAMENTUS_RPS", 5))
+HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"}
+
+_cliente = None
+
+
+def cliente_fundamentus():
+    """Cliente HTTP partilhado por todos os pedidos ao Fundamentus."""
+    global _cliente
+    if _cliente is None:
+        _cliente = ClienteHTTP(requisicoes_por_segundo=REQUISICOES_POR_SEGUNDO, max_workers=8, headers=HEADERS)
+    return _cliente
+
+def extrair_proventos_fundamentus(ticker_symbol, cliente=None):
+    """Tabela de proventos do Fundamentus, com datas em datetime64[ns]; None se o pedido falhar."""
+    ticker_sem_sa = ticker_symbol.replace(".SA", "")
+    url = URL_PROVENTOS.format(papel=ticker_sem_sa)
+    try:
+        with instrumentacao().medir_ticker("fundamentus", ticker_symbol):
+            response = (cliente or cliente_fundamentus()).get(url)
+    except ErroDeRede:
+        instrumentacao().contar("fundamentus.falhas")
+        return None
+    with instrumentacao().medir("fundamentus.ler_proventos"):
+        return ler_proventos(response.text)
+
+def extrair_proventos_em_paralelo(tickers, cliente=None):
+    """{ticker: proventos} para vários tickers, respeitando o limite de taxa do cliente."""
+    cliente = cliente or cliente_fundamentus()
+    return cliente.mapear(lambda ticker: extrair_proventos_fundamentus(ticker, cliente), tickers)
+
+def extrair_tickers_b3(cliente=None):
+    """Papéis listados na página de resultados do Fundamentus."""
+    response = (cliente or cliente_fundamentus()).get(URL_RESULTADO)
+    return ler_papeis(response.text)
@@ -0,0 +1,97 @@
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# Janelas do seletor de período (meses; None = todo o histórico)
+JANELAS = {"1M": 1, "6M": 6, "1A": 12, "Máx": None}
+PONTOS_PADRAO = 500
+MAX_SERIES_EM_CACHE = 16
+
+
+def inicio_da_janela(janela, hoje=None):
+    """Primeiro dia da janela ('1M', '6M', '1A', 'Máx'); None para todo o histórico."""
+    meses = JANELAS[janela]
+    if meses is None:
+        return None
+    return pd.Timestamp(hoje or date.today()) - pd.DateOffset(months=meses)
+
+def lttb(x, y, limite):
+    """Índices dos pontos escolhidos pelo Largest-Triangle-Three-Buckets.
+
+    Mantém o primeiro e o último ponto e, em cada balde, o ponto que forma o maior
+    triângulo com o ponto escolhido antes e a média do balde seguinte, o que preserva
+    picos e vales (ao contrário de uma amostragem regular).
+    """
+    n = len(x)
+    if limite >= n or limite < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    indices = np.empty(limite, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    tamanho = (n - 2) / (limite - 2)
+    anterior = 0
+    for i in range(limite - 2):
+        inicio = int(i * tamanho) + 1
+        fim = int((i + 1) * tamanho) + 1
+        seguinte_fim = min(int((i + 2) * tamanho) + 1, n)
+        media_x = x[fim:seguinte_fim].mean()
+        media_y = y[fim:seguinte_fim].mean()
+        areas = np.abs((x[anterior] - media_x) * (y[inicio:fim] - y[anterior]) - (x[anterior] - x[inicio:fim]) * (media_y - y[anterior]))
+        anterior = inicio + int(np.argmax(areas))
+        indices[i + 1] = anterior
+    return indices
+
+def reduzir_serie(df, coluna_data, coluna_valor, limite=PONTOS_PADRAO):
+    """Reduz a série a no máximo `limite` pontos com LTTB (devolve-a intacta se já for pequena)."""
+    if len(df) <= limite:
+        return df.reset_index(drop=True)
+    dias = pd.to_datetime(df[coluna_data]).to_numpy(dtype='datetime64[s]').astype(np.int64) / 86400.0
+    indices = lttb(dias, df[coluna_valor].to_numpy(dtype=float), limite)
+    return df.iloc[indices].reset_index(drop=True)
+
+
+class SeriesPatrimonio:
+    """Série do património por janela, reduzida a um número fixo de pontos e guardada em cache.
+
+    A chave da cache é a versão do histórico no repositório, pelo que entre reruns só
+    se volta a ler e reduzir a série quando entra um snapshot novo ou há um backfill.
+    """
+
+    def __init__(self, repositorio, pontos=PONTOS_PADRAO):
+        self.repositorio = repositorio
+        self.pontos = pontos
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._versao = None
+        self._historico = None
+
+    def _carregar(self):
+        versao = self.repositorio.versao_historico()
+        if versao != self._versao:
+            historico = self.repositorio.carregar_historico()
+            historico = historico.assign(Data=pd.to_datetime(historico['Data'])).sort_values('Data')
+            self._versao, self._historico = versao, historico.reset_index(drop=True)
+            self._cache.clear()
+        return versao
+
+    def serie(self, janela="Máx", hoje=None):
+        """DataFrame Data/ValorTotal da janela, com no máximo `pontos` linhas."""
+        with self._lock:
+            versao = self._carregar()
+            chave = (versao, janela, self.pontos, hoje or date.today())
+            if chave in self._cache:
+                self._cache.move_to_end(chave)
+                return self._cache[chave]
+            historico = self._historico
+            inicio = inicio_da_janela(janela, hoje)
+            if inicio is not None:
+                historico = historico[historico['Data'] >= inicio]
+            reduzida = reduzir_serie(historico, 'Data', 'ValorTotal', self.pontos)
+            self._cache[chave] = reduzida
+            while len(self._cache) > MAX_SERIES_EM_CACHE:
+                self._cache.popitem(last=False)
+            return reduzida
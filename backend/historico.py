@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+
+def matriz_de_posicoes(carteira, dias):
+    """Matriz dias × tickers com a quantidade detida no fim de cada dia."""
+    registos = [
+        (ticker, t['data'], t['quantidade'])
+        for ticker, transacoes in carteira.items()
+        for t in transacoes if t['tipo'] == 'compra'
+    ]
+    if not registos:
+        return pd.DataFrame(0.0, index=dias, columns=list(carteira.keys()))
+    compras = pd.DataFrame(registos, columns=['Ativo', 'Data', 'Quantidade'])
+    compras['Data'] = pd.to_datetime(compras['Data']).astype('datetime64[ns]')
+    por_dia = compras.pivot_table(index='Data', columns='Ativo', values='Quantidade', aggfunc='sum', fill_value=0.0)
+    calendario = por_dia.index.union(dias)
+    acumulado = por_dia.reindex(calendario, fill_value=0.0).cumsum()
+    return acumulado.reindex(dias).reindex(columns=list(carteira.keys()), fill_value=0.0)
+
+def calcular_valor_diario(posicoes, precos):
+    """Valor total da carteira por dia: posições × preços (ffill).
+
+    `precos` é uma matriz datas × tickers já em reais (ver `SerieCambio.converter`).
+    Dias em que nenhum ativo tem preço ficam de fora.
+    """
+    dias = posicoes.index
+    precos = precos.reindex(precos.index.union(dias)).sort_index().ffill().reindex(dias)
+    precos = precos.reindex(columns=posicoes.columns)
+    valores = posicoes.to_numpy(dtype=float) * precos.to_numpy(dtype=float)
+    total = np.nansum(valores, axis=1)
+    serie = pd.Series(total, index=dias, name='ValorTotal')
+    return serie[serie > 0]
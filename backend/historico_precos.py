@@ -0,0 +1,208 @@
+import json
+import os
+import threading
+from datetime import date, timedelta
+
+import pandas as pd
+import yfinance as yf
+
+from backend.caminhos import caminho_dados
+from backend.diario import bloqueio_de_ficheiro, gravar_atomico
+from backend.instrumentacao import instrumentacao
+
+PASTA_PRECOS = caminho_dados('precos')
+# Intervalos sem dados mais curtos do que isto (fins de semana, feriados) contam como cobertos
+DIAS_SEM_PREGAO = 4
+
+
+def _para_data(valor):
+    return valor if type(valor) is date else pd.Timestamp(valor).date()
+
+def _versao(caminho):
+    """(mtime, tamanho) do ficheiro, ou None se não existir."""
+    try:
+        estado = os.stat(caminho)
+    except OSError:
+        return None
+    return (estado.st_mtime_ns, estado.st_size)
+
+def _mesclar_intervalos(intervalos):
+    mesclados = []
+    for inicio, fim in sorted(intervalos):
+        if mesclados and inicio <= mesclados[-1][1] + timedelta(days=1):
+            mesclados[-1][1] = max(mesclados[-1][1], fim)
+        else:
+            mesclados.append([inicio, fim])
+    return mesclados
+
+def _baixar(tickers, inicio, fim):
+    """OHLC diário de vários tickers; devolve {ticker: DataFrame}."""
+    dados = yf.download(tickers, start=inicio, end=fim + timedelta(days=1), auto_adjust=False, progress=False, group_by='column')
+    if dados is None or dados.empty:
+        return {}
+    resultado = {}
+    for ticker in tickers:
+        if isinstance(dados.columns, pd.MultiIndex):
+            if ticker not in dados.columns.get_level_values(1):
+                continue
+            df = dados.xs(ticker, axis=1, level=1)
+        else:
+            df = dados
+        df = df.dropna(how='all')
+        if not df.empty:
+            df.index = pd.DatetimeIndex(df.index).tz_localize(None).normalize()
+            resultado[ticker] = df
+    return resultado
+
+
+class ArmazemPrecos:
+    """Histórico OHLC local, um ficheiro Parquet por ticker, que só descarrega as lacunas.
+
+    O índice `cobertura.json` guarda, por ticker, os intervalos de datas já descarregados.
+    O dia de hoje nunca fica marcado como coberto, para que a cotação do dia seja atualizada.
+    A aplicação, o atualizador e os scripts partilham a pasta: as cópias em memória são
+    revalidadas pela data de modificação dos ficheiros e cada escrita relê o disco sob um
+    bloqueio entre processos antes de mesclar.
+    """
+
+    def __init__(self, pasta=PASTA_PRECOS, baixar=_baixar):
+        self.pasta = pasta
+        self._baixar = baixar
+        self._lock = threading.RLock()
+        self._cobertura = (None, {})
+        self._memoria = {}
+
+    def _caminho(self, ticker):
+        return os.path.join(self.pasta, f"{ticker}.parquet")
+
+    @property
+    def _caminho_cobertura(self):
+        return os.path.join(self.pasta, 'cobertura.json')
+
+    @property
+    def _caminho_bloqueio(self):
+        return os.path.join(self.pasta, '.bloqueio')
+
+    def _carregar_cobertura(self):
+        versao = _versao(self._caminho_cobertura)
+        if versao is None or versao != self._cobertura[0]:
+            try:
+                with open(self._caminho_cobertura, 'r', encoding='utf-8') as arquivo:
+                    bruto = json.load(arquivo)
+            except (OSError, json.JSONDecodeError):
+                bruto = {}
+            self._cobertura = (versao, {t: [[date.fromisoformat(i), date.fromisoformat(f)] for i, f in intervalos] for t, intervalos in bruto.items()})
+        return self._cobertura[1]
+
+    def _gravar_cobertura(self, cobertura):
+        bruto = {t: [[i.isoformat(), f.isoformat()] for i, f in intervalos] for t, intervalos in cobertura.items()}
+        gravar_atomico(self._caminho_cobertura, json.dumps(bruto))
+        self._cobertura = (_versao(self._caminho_cobertura), cobertura)
+
+    def carregar(self, ticker):
+        """OHLC guardado do ticker (vazio se não existir ou se o ficheiro estiver ilegível)."""
+        with self._lock:
+            caminho = self._caminho(ticker)
+            versao = _versao(caminho)
+            em_memoria = self._memoria.get(ticker)
+            if em_memoria is None or em_memoria[0] != versao:
+                df = pd.DataFrame()
+                if versao is not None:
+                    try:
+                        df = pd.read_parquet(caminho)
+                    except Exception:
+                        instrumentacao().contar("precos.ficheiros_ilegiveis")
+                self._memoria[ticker] = em_memoria = (versao, df)
+            return em_memoria[1]
+
+    def tem_dados(self, ticker):
+        return not self.carregar(ticker).empty
+
+    def lacunas(self, ticker, inicio, fim):
+        """Intervalos de [inicio, fim] que ainda não foram descarregados."""
+        inicio, fim = _para_data(inicio), _para_data(fim)
+        lacunas, cursor = [], inicio
+        for coberto_inicio, coberto_fim in self._carregar_cobertura().get(ticker, []):
+            if coberto_fim < cursor:
+                continue
+            if coberto_inicio > fim:
+                break
+            if coberto_inicio > cursor:
+                lacunas.append((cursor, coberto_inicio - timedelta(days=1)))
+            cursor = coberto_fim + timedelta(days=1)
+        if cursor <= fim:
+            lacunas.append((cursor, fim))
+        return lacunas
+
+    def _guardar(self, novos, cobertos):
+        """Mescla {ticker: [DataFrame]} e {ticker: [[início, fim]]} com o que está em disco e grava."""
+        with self._lock, bloqueio_de_ficheiro(self._caminho_bloqueio):
+            for ticker, partes in novos.items():
+                # Relido sob o bloqueio: outro processo pode ter gravado entretanto
+                existente = self.carregar(ticker)
+                df = pd.concat([existente] + partes) if not existente.empty else pd.concat(partes)
+                df = df[~df.index.duplicated(keep='last')].sort_index()
+                gravar_atomico(self._caminho(ticker), df.to_parquet())
+                self._memoria[ticker] = (_versao(self._caminho(ticker)), df)
+            if cobertos:
+                cobertura = {t: [list(intervalo) for intervalo in intervalos] for t, intervalos in self._carregar_cobertura().items()}
+                for ticker, intervalos in cobertos.items():
+                    cobertura[ticker] = _mesclar_intervalos(cobertura.get(ticker, []) + intervalos)
+                self._gravar_cobertura(cobertura)
+
+    def atualizar(self, tickers, inicio, fim):
+        """Descarrega só as lacunas de cada ticker (agrupando tickers com a mesma lacuna).
+
+        Os downloads correm fora do bloqueio, pelo que pedidos de tickers diferentes (ex.:
+        cotações e câmbio) não esperam uns pelos outros; a mescla em `_guardar` relê o disco.
+        """
+        hoje = date.today()
+        with self._lock:
+            por_lacuna = {}
+            for ticker in dict.fromkeys(tickers):
+                for lacuna in self.lacunas(ticker, inicio, fim):
+                    por_lacuna.setdefault(lacuna, []).append(ticker)
+        instrumentacao().contar("precos.em_cache", len(set(tickers)) - len({t for grupo in por_lacuna.values() for t in grupo}))
+        if not por_lacuna:
+            return
+        novos, cobertos = {}, {}
+        for (lacuna_inicio, lacuna_fim), grupo in por_lacuna.items():
+            instrumentacao().contar("precos.descarregados", len(grupo))
+            try:
+                with instrumentacao().medir("precos.download", tickers=len(grupo), dias=(lacuna_fim - lacuna_inicio).days + 1):
+                    descarregados = self._baixar(grupo, lacuna_inicio, lacuna_fim)
+            except Exception:
+                continue
+            fim_coberto = min(lacuna_fim, hoje - timedelta(days=1))
+            for ticker in grupo:
+                if ticker in descarregados:
+                    novos.setdefault(ticker, []).append(descarregados[ticker])
+                elif (lacuna_fim - lacuna_inicio).days >= DIAS_SEM_PREGAO or lacuna_fim >= hoje:
+                    continue
+                if lacuna_inicio <= fim_coberto:
+                    cobertos.setdefault(ticker, []).append([lacuna_inicio, fim_coberto])
+        if novos or cobertos:
+            self._guardar(novos, cobertos)
+
+    def fechos(self, tickers, inicio, fim, coluna='Close'):
+        """Matriz datas × tickers de fechos no intervalo, descarregando só o que falta."""
+        tickers = list(dict.fromkeys(tickers))
+        self.atualizar(tickers, inicio, fim)
+        inicio, fim = pd.Timestamp(_para_data(inicio)), pd.Timestamp(_para_data(fim))
+        series = {}
+        for ticker in tickers:
+            df = self.carregar(ticker)
+            if not df.empty and coluna in df.columns:
+                series[ticker] = df.loc[inicio:fim, coluna]
+        return pd.DataFrame(series, columns=tickers)
+
+
+_armazem = None
+
+
+def armazem_precos():
+    """Armazém de preços partilhado pela aplicação e pelos scripts."""
+    global _armazem
+    if _armazem is None:
+        _armazem = ArmazemPrecos()
+    return _armazem
@@ -0,0 +1,121 @@
+import re
+from html import unescape
+
+import numpy as np
+import pandas as pd
+
+COLUNAS_PROVENTOS = ['data_ex', 'valor', 'Tipo', 'data_pag', 'Por quantas ações']
+# Cabeçalho da página de proventos -> coluna interna (a posição serve de recurso se o cabeçalho faltar)
+CABECALHO_PROVENTOS = {"Data": 'data_ex', "Valor": 'valor', "Tipo": 'Tipo', "Data de Pagamento": 'data_pag', "Por quantas ações": 'Por quantas ações'}
+
+_TAG_TABELA = re.compile(r'<(/?)table\b[^>]*>', re.I)
+_LINHA = re.compile(r'<tr\b[^>]*>(.*?)(?=<tr\b|</tbody|</thead|</tfoot|$)', re.I | re.S)
+# As células terminam no fecho, na célula seguinte ou no fim da linha (o fecho é opcional em HTML)
+_CELULA = re.compile(r'<t([dh])\b[^>]*>(.*?)(?=</t[dh]>|<t[dh]\b|</tr|$)', re.I | re.S)
+_TAG = re.compile(r'<[^>]*>')
+_DATA_BR = re.compile(r'(\d{2})/(\d{2})/(\d{4})$')
+
+
+def _trecho_da_tabela(html, id_tabela=None):
+    """HTML interior da primeira tabela (ou da tabela com `id_tabela`); '' se não existir."""
+    profundidade, inicio = 0, None
+    for tag in _TAG_TABELA.finditer(html):
+        if inicio is None:
+            if tag.group(1) or (id_tabela is not None and not re.search(r'\bid\s*=\s*["\']?' + re.escape(id_tabela) + r'\b', tag.group(0))):
+                continue
+            inicio, profundidade = tag.end(), 1
+        elif tag.group(1):
+            profundidade -= 1
+            if not profundidade:
+                return html[inicio:tag.start()]
+        else:
+            profundidade += 1
+    return html[inicio:] if inicio is not None else ""
+
+def _texto(celula):
+    return " ".join(unescape(_TAG.sub("", celula)).split()) if '<' in celula or '&' in celula else celula.strip()
+
+def ler_tabela(html, id_tabela=None):
+    """(cabeçalho, linhas) da primeira tabela (ou da tabela com `id_tabela`), em texto.
+
+    Só o trecho da tabela é percorrido (menus, rodapé e scripts da página são saltados) e
+    as linhas e células saem de uma única passagem com expressões pré-compiladas. Tabelas
+    encaixadas dentro da tabela alvo não são suportadas (o Fundamentus não as usa).
+    """
+    cabecalho, linhas = [], []
+    for linha in _LINHA.finditer(_trecho_da_tabela(html, id_tabela)):
+        celulas = _CELULA.findall(linha.group(1))
+        if not celulas:
+            continue
+        textos = [_texto(conteudo) for _, conteudo in celulas]
+        if not cabecalho and not linhas and all(tipo.lower() == 'h' for tipo, _ in celulas):
+            cabecalho = textos
+        else:
+            linhas.append(textos)
+    return cabecalho, linhas
+
+def numero_br(texto):
+    """'1.234,56' -> 1234.56; NaN se o texto não for um número."""
+    try:
+        return float(texto.replace('.', '').replace(',', '.').rstrip('%'))
+    except (AttributeError, ValueError):
+        return np.nan
+
+def data_br(texto):
+    """'31/12/2024' -> '2024-12-31'; None se o texto não for uma data dd/mm/aaaa."""
+    correspondencia = _DATA_BR.match(texto or "")
+    if not correspondencia:
+        return None
+    dia, mes, ano = correspondencia.groups()
+    return f"{ano}-{mes}-{dia}"
+
+def _posicoes(cabecalho, nomes):
+    """{coluna interna: índice} pelo nome do cabeçalho, ou pela ordem se o cabeçalho não for reconhecido."""
+    posicoes = {interna: cabecalho.index(nome) for nome, interna in nomes.items() if nome in cabecalho}
+    if len(posicoes) == len(nomes):
+        return posicoes
+    return {interna: indice for indice, interna in enumerate(nomes.values())}
+
+def proventos_vazios():
+    """Tabela de proventos sem linhas, já com as colunas de datas em datetime64[ns]."""
+    return pd.DataFrame({
+        'data_ex': np.array([], dtype='datetime64[ns]'),
+        'valor': np.array([], dtype=float),
+        'Tipo': np.array([], dtype=object),
+        'data_pag': np.array([], dtype='datetime64[ns]'),
+        'Por quantas ações': np.array([], dtype=np.int64),
+    }, columns=COLUNAS_PROVENTOS)
+
+def ler_proventos(html):
+    """Tabela da página de proventos: datas em datetime64[ns] (NaT sem data de pagamento), valor em float."""
+    cabecalho, linhas = ler_tabela(html)
+    if not linhas:
+        return proventos_vazios()
+    posicoes = _posicoes(cabecalho, CABECALHO_PROVENTOS)
+    largura = max(posicoes.values()) + 1
+    colunas = {coluna: [] for coluna in COLUNAS_PROVENTOS}
+    for linha in linhas:
+        if len(linha) < largura:
+            continue
+        data_ex = data_br(linha[posicoes['data_ex']])
+        if data_ex is None:
+            continue
+        colunas['data_ex'].append(data_ex)
+        colunas['valor'].append(numero_br(linha[posicoes['valor']]))
+        colunas['Tipo'].append(linha[posicoes['Tipo']])
+        colunas['data_pag'].append(data_br(linha[posicoes['data_pag']]))
+        colunas['Por quantas ações'].append(numero_br(linha[posicoes['Por quantas ações']]))
+    quantidades = np.array(colunas['Por quantas ações'], dtype=float)
+    return pd.DataFrame({
+        'data_ex': np.array(colunas['data_ex'], dtype='datetime64[D]').astype('datetime64[ns]'),
+        'valor': np.array(colunas['valor'], dtype=float),
+        'Tipo': np.array(colunas['Tipo'], dtype=object),
+        'data_pag': np.array(colunas['data_pag'], dtype='datetime64[D]').astype('datetime64[ns]'),
+        'Por quantas ações': quantidades.astype(np.int64) if np.isfinite(quantidades).all() else quantidades,
+    }, columns=COLUNAS_PROVENTOS)
+
+def ler_papeis(html):
+    """Papéis (primeira coluna, ou a coluna 'Papel') da página de resultados."""
+    cabecalho, linhas = ler_tabela(html)
+    coluna = cabecalho.index("Papel") if "Papel" in cabecalho else 0
+    return [linha[coluna] for linha in linhas if len(linha) > coluna and linha[coluna]]
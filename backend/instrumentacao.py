@@ -0,0 +1,159 @@
+import csv
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from io import StringIO
+
+# Se definida, cada execução (rerun da aplicação ou script) acrescenta os tempos a este ficheiro (.jsonl ou .csv)
+CAMINHO_TEMPOS = os.environ.get("KINVO_TEMPOS")
+COLUNAS_CSV = ["execucao", "tipo", "nome", "duracao", "detalhe"]
+# O coletor do processo vive enquanto o servidor: guarda só as etapas e latências mais recentes
+LIMITE_ETAPAS_PROCESSO = 500
+LIMITE_LATENCIAS_POR_TICKER = 20
+
+
+class Instrumentacao:
+    """Tempos por etapa, contadores (ex.: acertos/falhas de cache) e latência por ticker de uma execução.
+
+    Cada execução (um rerun de uma sessão do Streamlit, um ciclo do atualizador) tem o seu
+    coletor, criado com `nova_execucao()`; o trabalho fora de uma execução (threads de
+    atualização em segundo plano, scripts) vai para o coletor do processo, que só guarda
+    as últimas `limite_etapas` etapas e `limite_por_ticker` latências de cada ticker.
+    """
+
+    def __init__(self, limite_etapas=None, limite_por_ticker=None):
+        self._lock = threading.Lock()
+        self.execucao = datetime.now().isoformat(timespec='seconds')
+        self.limite_por_ticker = limite_por_ticker
+        self.etapas = deque(maxlen=limite_etapas)
+        self.contadores = Counter()
+        self.latencias = {}
+
+    def registar_etapa(self, etapa, duracao, **detalhe):
+        with self._lock:
+            self.etapas.append({"etapa": etapa, "duracao": duracao, **detalhe})
+
+    @contextmanager
+    def medir(self, etapa, **detalhe):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registar_etapa(etapa, time.perf_counter() - inicio, **detalhe)
+
+    def contar(self, nome, quantidade=1):
+        with self._lock:
+            self.contadores[nome] += quantidade
+
+    def registar_latencia(self, fonte, ticker, segundos):
+        with self._lock:
+            self.latencias.setdefault(fonte, {}).setdefault(ticker, deque(maxlen=self.limite_por_ticker)).append(segundos)
+
+    @contextmanager
+    def medir_ticker(self, fonte, ticker):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registar_latencia(fonte, ticker, time.perf_counter() - inicio)
+
+    def tickers_mais_lentos(self, limite=10):
+        """[(fonte, ticker, segundos)] ordenados do mais lento para o mais rápido."""
+        with self._lock:
+            linhas = [(fonte, ticker, max(tempos)) for fonte, por_ticker in self.latencias.items() for ticker, tempos in por_ticker.items()]
+        return sorted(linhas, key=lambda linha: linha[2], reverse=True)[:limite]
+
+    def resumo(self):
+        with self._lock:
+            return {
+                "execucao": self.execucao,
+                "etapas": list(self.etapas),
+                "contadores": dict(self.contadores),
+                "latencias": {fonte: {t: max(v) for t, v in por_ticker.items()} for fonte, por_ticker in self.latencias.items()},
+            }
+
+    def linhas(self):
+        """Tudo numa tabela plana (execucao, tipo, nome, duracao, detalhe), pronta para CSV."""
+        resumo = self.resumo()
+        linhas = []
+        for etapa in resumo["etapas"]:
+            detalhe = {k: v for k, v in etapa.items() if k not in ("etapa", "duracao")}
+            linhas.append([resumo["execucao"], "etapa", etapa["etapa"], round(etapa["duracao"], 6), json.dumps(detalhe, ensure_ascii=False) if detalhe else ""])
+        for nome, valor in resumo["contadores"].items():
+            linhas.append([resumo["execucao"], "contador", nome, valor, ""])
+        for fonte, por_ticker in resumo["latencias"].items():
+            for ticker, segundos in por_ticker.items():
+                linhas.append([resumo["execucao"], "latencia", ticker, round(segundos, 6), fonte])
+        return linhas
+
+    def para_json(self):
+        return json.dumps(self.resumo(), ensure_ascii=False)
+
+    def para_csv(self):
+        saida = StringIO()
+        escritor = csv.writer(saida)
+        escritor.writerow(COLUNAS_CSV)
+        escritor.writerows(self.linhas())
+        return saida.getvalue()
+
+    def acrescentar_registo(self, caminho=CAMINHO_TEMPOS):
+        """Acrescenta esta execução a um ficheiro .csv (linhas) ou .jsonl (um objeto por execução)."""
+        if not caminho: return
+        if caminho.endswith('.csv'):
+            novo = not os.path.exists(caminho) or os.path.getsize(caminho) == 0
+            with open(caminho, 'a', encoding='utf-8', newline='') as arquivo:
+                escritor = csv.writer(arquivo)
+                if novo:
+                    escritor.writerow(COLUNAS_CSV)
+                escritor.writerows(self.linhas())
+        else:
+            with open(caminho, 'a', encoding='utf-8') as arquivo:
+                arquivo.write(self.para_json() + "\n")
+
+    def imprimir_resumo(self, limite=5):
+        """Resumo curto para os scripts: etapas mais demoradas e tickers mais lentos."""
+        resumo = self.resumo()
+        etapas = sorted(resumo["etapas"], key=lambda etapa: etapa["duracao"], reverse=True)[:limite]
+        if etapas:
+            print("\nTempos por etapa: " + ", ".join(f"{e['etapa']} {e['duracao']:.2f}s" for e in etapas))
+        lentos = self.tickers_mais_lentos(limite)
+        if lentos:
+            print("Tickers mais lentos: " + ", ".join(f"{ticker} ({fonte}) {segundos:.2f}s" for fonte, ticker, segundos in lentos))
+
+
+_do_processo = Instrumentacao(LIMITE_ETAPAS_PROCESSO, LIMITE_LATENCIAS_POR_TICKER)
+_da_execucao = ContextVar("instrumentacao", default=None)
+
+
+def instrumentacao():
+    """Coletor da execução em curso neste contexto ou, fora de uma execução, o do processo."""
+    return _da_execucao.get() or _do_processo
+
+def coletor_do_processo():
+    """Coletor do trabalho em segundo plano (ex.: a sincronização de proventos com o Fundamentus)."""
+    return _do_processo
+
+def nova_execucao():
+    """Começa um coletor novo para a execução em curso neste contexto (thread) e devolve-o."""
+    coletor = Instrumentacao()
+    _da_execucao.set(coletor)
+    return coletor
+
+def no_contexto_atual(funcao):
+    """`funcao` presa ao coletor atual, para que o trabalho feito num pool de threads conte para esta execução."""
+    coletor = _da_execucao.get()
+    if coletor is None:
+        return funcao
+
+    def envolvida(*args, **kwargs):
+        token = _da_execucao.set(coletor)
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            _da_execucao.reset(token)
+    return envolvida
@@ -0,0 +1,109 @@
+import hashlib
+from collections import OrderedDict
+from datetime import date, datetime
+
+import pandas as pd
+
+from backend.agregados import proventos_mensais
+from backend.ativos import categorizar_ativo
+from backend.instrumentacao import instrumentacao
+from backend.proventos import calcular_direitos, lotes_do_livro, preparar_proventos, totais_por_status
+
+ORDEM_STATUS = {'Qualificado': 1, 'Aguardando Pagamento': 2, 'Pago': 3, 'Provisionado': 4, 'Anunciado': 5}
+MAX_RESULTADOS = 8
+
+
+def calcular_carteira(livro, precos_atuais, dividendos_por_ativo):
+    """Uma linha por ativo com posição, valor atual, dividendos e rentabilidades."""
+    dados_processados = []
+    for ticker in livro.tickers_com_posicao():
+        posicao = livro.posicoes[ticker]
+        quantidade_total, custo_total = posicao.quantidade_total, posicao.custo_total
+        preco_atual = precos_atuais.get(ticker)
+        valor_atual = preco_atual * quantidade_total if preco_atual else custo_total
+        dados_processados.append({
+            "Ativo": ticker, "Quantidade": quantidade_total, "Preço Médio (R$)": posicao.preco_medio,
+            "Custo Total (R$)": custo_total, "Preço Atual (R$)": preco_atual, "Valor Atual (R$)": valor_atual,
+            "Dividendos a Receber (R$)": dividendos_por_ativo.at[ticker, "Dividendos a Receber (R$)"],
+            "Dividendos Recebidos (R$)": dividendos_por_ativo.at[ticker, "Dividendos Recebidos (R$)"]
+        })
+
+    df_carteira = pd.DataFrame(dados_processados)
+    if not df_carteira.empty:
+        df_carteira['Lucro/Prejuízo (R$)'] = df_carteira['Valor Atual (R$)'] - df_carteira['Custo Total (R$)']
+        df_carteira['Rentabilidade (%)'] = (df_carteira['Lucro/Prejuízo (R$)'] / df_carteira['Custo Total (R$)'] * 100).fillna(0)
+        df_carteira['Rentabilidade com Div. (%)'] = ((df_carteira['Valor Atual (R$)'] + df_carteira['Dividendos Recebidos (R$)'] - df_carteira['Custo Total (R$)']) / df_carteira['Custo Total (R$)'] * 100).fillna(0)
+        df_carteira['Lucro/Prejuízo com Div. (R$)'] = df_carteira['Valor Atual (R$)'] + df_carteira['Dividendos Recebidos (R$)'] - df_carteira['Custo Total (R$)']
+        df_carteira['Tipo'] = df_carteira['Ativo'].apply(categorizar_ativo)
+    return df_carteira
+
+def tabela_de_proventos(df_direitos):
+    """Proventos com valor a receber, ordenados por status e com datas formatadas para exibição."""
+    df_proventos = df_direitos[df_direitos['Total a Receber (R$)'] > 0].copy()
+    if df_proventos.empty:
+        return df_proventos
+    df_proventos['Data Pagamento'] = df_proventos['Data Pagamento'].astype(str)
+    df_proventos['Status_Order'] = df_proventos['Status'].map(ORDEM_STATUS).fillna(99)
+    df_proventos.sort_values(by=['Status_Order', 'Data Pagamento'], ascending=[True, False], inplace=True)
+    df_proventos.drop(columns=['Status_Order'], inplace=True)
+    df_proventos['Data Ex'] = pd.to_datetime(df_proventos['Data Ex']).dt.strftime('%d/%m/%Y')
+    df_proventos['Data Pagamento'] = df_proventos['Data Pagamento'].apply(
+        lambda x: x.strftime('%d/%m/%Y') if isinstance(x, (datetime, date)) else str(x)
+    )
+    return df_proventos
+
+def tabela_de_aportes(aportes):
+    """Aportes dia a dia, do mais recente para o mais antigo."""
+    df_aportes = pd.DataFrame(aportes, columns=["Data", "Ticker", "Valor do Aporte"])
+    return df_aportes.sort_values(by="Data", ascending=False)
+
+def _impressao(*partes):
+    """Hash estável das entradas do cálculo (DataFrames são resumidos pelo conteúdo)."""
+    h = hashlib.sha256()
+    for parte in partes:
+        if isinstance(parte, pd.DataFrame):
+            h.update(pd.util.hash_pandas_object(parte, index=False).values.tobytes())
+            h.update(repr(list(parte.columns)).encode())
+        else:
+            h.update(repr(parte).encode())
+        h.update(b'|')
+    return h.hexdigest()
+
+
+class MotorCarteira:
+    """Calcula os quadros da carteira fora do Streamlit, com memoização pelas entradas.
+
+    A chave combina a versão e o resumo das posições, as cotações, os proventos e o dia (o status dos
+    proventos depende da data), pelo que um rerun só por mudança de filtro reaproveita
+    o resultado anterior.
+    """
+
+    def __init__(self, max_resultados=MAX_RESULTADOS):
+        self.max_resultados = max_resultados
+        self._resultados = OrderedDict()
+
+    def calcular(self, livro, precos_atuais, proventos_brutos, hoje=None):
+        hoje = hoje or date.today()
+        tickers = livro.tickers_com_posicao()
+        posicoes = [(t, len(p.datas), p.quantidade_total, p.custo_total) for t, p in livro.posicoes.items()]
+        chave = _impressao(livro.versao, posicoes, sorted(precos_atuais.items()), proventos_brutos, hoje)
+        if chave in self._resultados:
+            instrumentacao().contar("motor.acertos")
+            self._resultados.move_to_end(chave)
+            return self._resultados[chave]
+        instrumentacao().contar("motor.falhas")
+
+        with instrumentacao().medir("motor.calcular", ativos=len(tickers)):
+            df_direitos = calcular_direitos(preparar_proventos(proventos_brutos, hoje), lotes_do_livro(livro, tickers))
+            dividendos_por_ativo = totais_por_status(df_direitos).reindex(tickers, fill_value=0.0)
+            resultado = {
+                "carteira": calcular_carteira(livro, precos_atuais, dividendos_por_ativo),
+                "direitos": df_direitos,
+                "proventos": tabela_de_proventos(df_direitos) if not df_direitos.empty else df_direitos,
+                "aportes": tabela_de_aportes(livro.aportes),
+                "proventos_mensais": proventos_mensais(df_direitos, hoje),
+            }
+        self._resultados[chave] = resultado
+        while len(self._resultados) > self.max_resultados:
+            self._resultados.popitem(last=False)
+        return resultado
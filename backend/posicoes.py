@@ -0,0 +1,123 @@
+from bisect import bisect_left, bisect_right
+from datetime import date
+from itertools import accumulate
+
+from backend.agregados import AgregadoMensal
+
+
+def _data_iso(data):
+    return data.isoformat() if isinstance(data, date) else str(data)
+
+
+class PosicaoAtivo:
+    """Compras de um ticker ordenadas por data, com a quantidade acumulada."""
+
+    def __init__(self):
+        self.datas = []
+        self.quantidades = []
+        self.acumuladas = []
+        self.quantidade_total = 0
+        self.custo_total = 0.0
+
+    @classmethod
+    def a_partir_das_compras(cls, compras):
+        """Posição construída de uma vez a partir de [(data, quantidade, preço unitário), ...]."""
+        posicao = cls()
+        compras = sorted(((_data_iso(data), quantidade, preco) for data, quantidade, preco in compras), key=lambda compra: compra[0])
+        posicao.datas = [data for data, _, _ in compras]
+        posicao.quantidades = [quantidade for _, quantidade, _ in compras]
+        posicao.acumuladas = list(accumulate(posicao.quantidades))
+        posicao.quantidade_total = posicao.acumuladas[-1] if compras else 0
+        posicao.custo_total = sum(quantidade * preco for _, quantidade, preco in compras)
+        return posicao
+
+    def adicionar(self, data, quantidade, preco_unitario):
+        data = _data_iso(data)
+        posicao = bisect_right(self.datas, data)
+        self.datas.insert(posicao, data)
+        self.quantidades.insert(posicao, quantidade)
+        acumulada = self.acumuladas[posicao - 1] if posicao > 0 else 0
+        self.acumuladas.insert(posicao, 0)
+        for i in range(posicao, len(self.datas)):
+            acumulada += self.quantidades[i]
+            self.acumuladas[i] = acumulada
+        self.quantidade_total += quantidade
+        self.custo_total += quantidade * preco_unitario
+
+    def quantidade_em(self, data, incluir_dia=False):
+        """Quantidade detida antes de `data` (ou até `data`, com incluir_dia=True)."""
+        data = _data_iso(data)
+        posicao = bisect_right(self.datas, data) if incluir_dia else bisect_left(self.datas, data)
+        return self.acumuladas[posicao - 1] if posicao > 0 else 0
+
+    @property
+    def preco_medio(self):
+        return self.custo_total / self.quantidade_total if self.quantidade_total > 0 else 0.0
+
+
+class LivroDePosicoes:
+    """Posições por ticker pré-calculadas a partir da carteira e atualizadas a cada compra."""
+
+    def __init__(self):
+        self.posicoes = {}
+        self.aportes = []
+        self.aportes_mensais = AgregadoMensal(["Valor do Aporte"])
+        self.versao = None
+
+    @classmethod
+    def a_partir_da_carteira(cls, carteira, versao=None):
+        livro = cls()
+        livro._carregar(carteira)
+        livro.versao = versao
+        return livro
+
+    def _carregar(self, carteira):
+        self.posicoes, self.aportes = {}, []
+        self.aportes_mensais = AgregadoMensal(["Valor do Aporte"])
+        for ticker, transacoes in carteira.items():
+            compras = [transacao for transacao in transacoes if transacao["tipo"] == "compra"]
+            self.posicoes[ticker] = PosicaoAtivo.a_partir_das_compras(
+                (compra["data"], compra["quantidade"], compra["preco_unitario"]) for compra in compras)
+            for compra in compras:
+                self._registar_aporte(ticker, compra)
+
+    def _registar_aporte(self, ticker, transacao):
+        valor = transacao["quantidade"] * transacao["preco_unitario"]
+        self.aportes.append({"Data": transacao["data"], "Ticker": ticker, "Valor do Aporte": valor})
+        self.aportes_mensais.acrescentar(transacao["data"], ticker, "Valor do Aporte", valor)
+
+    def adicionar_transacao(self, ticker, transacao):
+        if transacao["tipo"] == "compra":
+            posicao = self.posicoes.setdefault(ticker, PosicaoAtivo())
+            posicao.adicionar(transacao["data"], transacao["quantidade"], transacao["preco_unitario"])
+            self._registar_aporte(ticker, transacao)
+
+    def registar_transacao(self, repositorio, ticker, transacao):
+        """Grava a transação no repositório e atualiza o livro.
+
+        A atualização incremental só é aplicada se o livro estava na versão da carteira
+        anterior à escrita; se outra escrita entrou entretanto, o livro é recarregado.
+        """
+        anterior = repositorio.versao_carteira()
+        repositorio.adicionar_transacao(ticker, transacao)
+        if anterior == self.versao:
+            self.adicionar_transacao(ticker, transacao)
+            self.versao = repositorio.versao_carteira()
+        else:
+            self.sincronizar(repositorio)
+        return self
+
+    def sincronizar(self, repositorio):
+        """Reconstrói o livro só se a carteira mudou desde a última leitura."""
+        versao = repositorio.versao_carteira()
+        if versao != self.versao:
+            self._carregar(repositorio.carregar_carteira())
+            self.versao = versao
+        return self
+
+    def tickers_com_posicao(self):
+        return [ticker for ticker, posicao in self.posicoes.items() if posicao.quantidade_total > 0]
+
+    def quantidade_em(self, ticker, data, incluir_dia=False):
+        posicao = self.posicoes.get(ticker)
+        return posicao.quantidade_em(data, incluir_dia) if posicao else 0
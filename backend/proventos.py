@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+from datetime import date, timedelta
+
+DATA_MINIMA = pd.Timestamp(2000, 1, 1)
+COLUNAS_PROVENTOS = ['Ativo', 'valor', 'data_ex', 'data_pag', 'status']
+
+
+def classificar_status(data_ex, data_pag, hoje=None):
+    """Status de cada provento a partir das datas ex e de pagamento (vetorizado)."""
+    hoje = pd.Timestamp(hoje or date.today())
+    tem_pagamento = data_pag.notna()
+    condicoes = [
+        (data_ex > hoje) & tem_pagamento & (data_pag > hoje),
+        data_ex > hoje,
+        tem_pagamento & (data_pag > hoje),
+        tem_pagamento,
+    ]
+    escolhas = ["Provisionado", "Anunciado", "Qualificado", "Pago"]
+    return np.select(condicoes, escolhas, default="Aguardando Pagamento")
+
+def preparar_proventos(df, hoje=None):
+    """Descarta proventos anteriores a 2000 e calcula o status.
+
+    As datas já vêm em datetime64[ns] do leitor do Fundamentus e dos repositórios.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=COLUNAS_PROVENTOS)
+    df = df[df['data_ex'] >= DATA_MINIMA].copy()
+    df['status'] = classificar_status(df['data_ex'], df['data_pag'], hoje)
+    return df
+
+def lotes_do_livro(livro, tickers=None):
+    """Quantidade acumulada por (Ativo, Data) a partir do livro de posições."""
+    tickers = livro.posicoes.keys() if tickers is None else tickers
+    partes = []
+    for ticker in tickers:
+        posicao = livro.posicoes.get(ticker)
+        if posicao and posicao.datas:
+            partes.append(pd.DataFrame({'Ativo': ticker, 'Data': posicao.datas, 'QuantidadeAcumulada': posicao.acumuladas}))
+    if not partes:
+        return pd.DataFrame(columns=['Ativo', 'Data', 'QuantidadeAcumulada'])
+    lotes = pd.concat(partes, ignore_index=True)
+    lotes['Data'] = pd.to_datetime(lotes['Data']).astype('datetime64[ns]')
+    return lotes.drop_duplicates(subset=['Ativo', 'Data'], keep='last')
+
+def calcular_direitos(df_proventos, df_lotes):
+    """Junta proventos e lotes por data ex (merge_asof) e calcula o total a receber.
+
+    A quantidade habilitada é a acumulada na última compra estritamente anterior à data ex.
+    """
+    colunas = ["Ativo", "Status", "Valor por Ação (R$)", "Data Ex", "Data Pagamento", "Total a Receber (R$)"]
+    if df_proventos.empty or df_lotes.empty:
+        return pd.DataFrame(columns=colunas)
+    juntos = pd.merge_asof(
+        df_proventos.sort_values('data_ex'),
+        df_lotes.sort_values('Data'),
+        left_on='data_ex', right_on='Data', by='Ativo',
+        direction='backward', allow_exact_matches=False,
+    )
+    quantidade = juntos['QuantidadeAcumulada'].fillna(0).to_numpy()
+    valor = juntos['valor'].to_numpy(dtype=float)
+    data_pagamento = juntos['data_pag'].dt.date.astype(object).where(juntos['data_pag'].notna(), 'A confirmar')
+    return pd.DataFrame({
+        "Ativo": juntos['Ativo'].to_numpy(),
+        "Status": juntos['status'].to_numpy(),
+        "Valor por Ação (R$)": valor,
+        "Data Ex": juntos['data_ex'].dt.date.to_numpy(),
+        "Data Pagamento": data_pagamento.to_numpy(),
+        "Total a Receber (R$)": np.where(quantidade > 0, quantidade * valor, 0.0),
+    })
+
+def totais_por_status(df_direitos):
+    """Totais por ativo: 'Dividendos a Receber (R$)' (Qualificado) e 'Dividendos Recebidos (R$)' (Pago)."""
+    colunas = {'Qualificado': "Dividendos a Receber (R$)", 'Pago': "Dividendos Recebidos (R$)"}
+    tabela = df_direitos.pivot_table(index='Ativo', columns='Status', values='Total a Receber (R$)', aggfunc='sum', fill_value=0.0) if not df_direitos.empty else pd.DataFrame()
+    return tabela.reindex(columns=list(colunas)).fillna(0.0).rename(columns=colunas)
+
+def recebidos_em_12_meses(repositorio, tickers, hoje=None):
+    """Proventos pagos nos últimos 12 meses, por ativo, com a quantidade detida antes da data ex.
+
+    As duas partes são consultas de intervalo ao repositório (pagamentos na janela e
+    quantidades nas datas ex), que no SQLite usam os índices em data_pag e (ticker, data).
+    """
+    hoje = hoje or date.today()
+    pagos = repositorio.dividendos_entre(hoje - timedelta(days=365), hoje, tickers)
+    if pagos.empty:
+        return pd.Series(dtype=float, name="Recebidos em 12 Meses (R$)")
+    quantidades = repositorio.quantidades_em(zip(pagos['Ativo'], pagos['data_ex']))
+    totais = pd.Series(quantidades * pagos['valor'].to_numpy(dtype=float), index=pagos['Ativo'].to_numpy())
+    return totais.groupby(level=0).sum().rename("Recebidos em 12 Meses (R$)")
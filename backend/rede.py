@@ -0,0 +1,99 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from backend.instrumentacao import no_contexto_atual
+
+STATUS_REPETIVEIS = {429, 500, 502, 503, 504}
+# Erros de transporte transitórios; os restantes (URL inválido, redirecionamentos em ciclo...) não se repetem
+ERROS_REPETIVEIS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.ContentDecodingError)
+# Teto da espera entre tentativas, mesmo que o servidor peça mais no Retry-After
+ESPERA_MAXIMA = 30.0
+
+
+class ErroDeRede(Exception):
+    """Pedido HTTP que falhou mesmo depois de todas as tentativas."""
+
+
+class LimitadorDeTaxa:
+    """Garante no máximo `por_segundo` pedidos por segundo entre todas as threads."""
+
+    def __init__(self, por_segundo):
+        self.intervalo = 1.0 / por_segundo if por_segundo else 0.0
+        self._proximo = 0.0
+        self._lock = threading.Lock()
+
+    def aguardar(self):
+        if not self.intervalo:
+            return
+        with self._lock:
+            agora = time.monotonic()
+            vez = max(agora, self._proximo)
+            self._proximo = vez + self.intervalo
+        if vez > agora:
+            time.sleep(vez - agora)
+
+
+class ClienteHTTP:
+    """Sessão HTTP partilhada com keep-alive, limite de taxa, timeout e novas tentativas.
+
+    Respostas 429/5xx e erros de ligação são repetidos com backoff exponencial
+    (respeitando o cabeçalho Retry-After quando existe, até `espera_maxima`). Qualquer
+    falha do pedido chega a quem chama como ErroDeRede.
+    """
+
+    def __init__(self, requisicoes_por_segundo=5, max_workers=8, tentativas=4, timeout=10, backoff=0.5, headers=None, espera_maxima=ESPERA_MAXIMA):
+        self.max_workers = max_workers
+        self.tentativas = tentativas
+        self.timeout = timeout
+        self.backoff = backoff
+        self.espera_maxima = espera_maxima
+        self.limitador = LimitadorDeTaxa(requisicoes_por_segundo)
+        self.sessao = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.sessao.mount("http://", adaptador)
+        self.sessao.mount("https://", adaptador)
+        if headers:
+            self.sessao.headers.update(headers)
+
+    def _espera(self, tentativa, resposta=None):
+        retry_after = resposta.headers.get("Retry-After") if resposta is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.espera_maxima)
+        return min(self.backoff * (2 ** tentativa), self.espera_maxima)
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        ultimo_erro = None
+        for tentativa in range(self.tentativas):
+            self.limitador.aguardar()
+            try:
+                resposta = self.sessao.get(url, **kwargs)
+            except ERROS_REPETIVEIS as e:
+                ultimo_erro = e
+                resposta = None
+            except requests.RequestException as e:
+                raise ErroDeRede(f"{url}: {e}") from e
+            else:
+                if resposta.status_code not in STATUS_REPETIVEIS:
+                    try:
+                        resposta.raise_for_status()
+                    except requests.HTTPError as e:
+                        raise ErroDeRede(f"{url}: {e}") from e
+                    return resposta
+                ultimo_erro = requests.HTTPError(f"HTTP {resposta.status_code}", response=resposta)
+            if tentativa < self.tentativas - 1:
+                time.sleep(self._espera(tentativa, resposta))
+        raise ErroDeRede(f"{url}: {ultimo_erro}") from ultimo_erro
+
+    def mapear(self, funcao, itens):
+        """Executa funcao(item) em paralelo no pool do cliente e devolve {item: resultado}."""
+        itens = list(itens)
+        if not itens:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(itens))) as pool:
+            return dict(zip(itens, pool.map(no_contexto_atual(funcao), itens)))
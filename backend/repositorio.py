@@ -0,0 +1,350 @@
+import json
+import os
+import sqlite3
+from bisect import bisect_left, bisect_right
+from contextlib import closing
+from itertools import accumulate
+
+import numpy as np
+import pandas as pd
+
+from backend.caminhos import caminho_dados, data_folder_path
+from backend.diario import DiarioCarteira, compactar_historico, gravar_atomico, registar_snapshot
+from backend.fundamentus import COLUNAS_PROVENTOS
+from backend.html_fundamentus import proventos_vazios
+
+COLUNAS_DIVIDENDOS = COLUNAS_PROVENTOS + ['Ativo']
+CHAVE_DIVIDENDOS = ['Ativo', 'data_ex', 'Tipo']
+DATAS_DIVIDENDOS = ['data_ex', 'data_pag']
+CAMINHO_SQLITE = caminho_dados('carteira.db')
+
+
+def _data_iso(data):
+    return pd.Timestamp(data).strftime('%Y-%m-%d')
+
+def _dividendos_vazios():
+    return proventos_vazios().assign(Ativo=pd.Series([], dtype=object))
+
+def _ler_datas(df):
+    """Datas dos proventos gravadas em ISO -> datetime64[ns] (NaT sem data de pagamento)."""
+    for coluna in DATAS_DIVIDENDOS:
+        df[coluna] = pd.to_datetime(df[coluna], format='%Y-%m-%d', errors='coerce').astype('datetime64[ns]')
+    return df
+
+def _gravar_datas(df):
+    """Cópia de `df` com as datas dos proventos em ISO e None no lugar de NaT (para o SQLite)."""
+    df = df.astype(object)
+    for coluna in DATAS_DIVIDENDOS:
+        if coluna in df:
+            df[coluna] = [data.strftime('%Y-%m-%d') if pd.notna(data) else None for data in df[coluna]]
+    return df.where(df.notna(), None)
+
+
+def _filtrar_chaves(df, chaves):
+    """Máscara das linhas de `df` cuja chave (Ativo, data_ex, Tipo) está em `chaves`."""
+    return pd.MultiIndex.from_frame(df[CHAVE_DIVIDENDOS].astype(object)).isin(
+        pd.MultiIndex.from_frame(chaves[CHAVE_DIVIDENDOS].astype(object)))
+
+
+class RepositorioArquivos:
+    """Backend padrão: os ficheiros JSON/CSV em data/."""
+
+    def __init__(self, pasta=data_folder_path):
+        self.pasta = pasta
+        self.diario = DiarioCarteira(os.path.join(pasta, 'carteira.json'))
+        self.caminho_historico = os.path.join(pasta, 'historico_portfolio.csv')
+        self.caminho_dividendos = os.path.join(pasta, 'historico_dividendos.csv')
+        self.caminho_sincronizacao = os.path.join(pasta, 'historico_dividendos_sync.json')
+        self.caminho_tickers = os.path.join(pasta, 'all_tickers.json')
+        self._dividendos, self._versao_dividendos = None, None
+
+    @property
+    def descricao(self):
+        return self.pasta
+
+    # --- Transações ---
+    def carregar_carteira(self):
+        return self.diario.carregar()
+
+    def versao_carteira(self):
+        return self.diario.versao()
+
+    def adicionar_transacao(self, ticker, transacao):
+        self.diario.adicionar(ticker, transacao)
+
+    def quantidades_em(self, pares, incluir_dia=False):
+        """Quantidade comprada antes de cada data (ou até ela, com incluir_dia=True), para [(ticker, data), ...]."""
+        carteira, acumuladas = self.carregar_carteira(), {}
+        resultado = []
+        for ticker, data in pares:
+            if ticker not in acumuladas:
+                compras = sorted((t['data'], t['quantidade']) for t in carteira.get(ticker, []) if t['tipo'] == 'compra')
+                acumuladas[ticker] = ([d for d, _ in compras], list(accumulate(q for _, q in compras)))
+            datas, totais = acumuladas[ticker]
+            data = _data_iso(data)
+            posicao = bisect_right(datas, data) if incluir_dia else bisect_left(datas, data)
+            resultado.append(totais[posicao - 1] if posicao > 0 else 0)
+        return np.array(resultado, dtype=float)
+
+    # --- Histórico de património ---
+    def registar_snapshot(self, data, valor_total):
+        return registar_snapshot(self.caminho_historico, data, valor_total)
+
+    def gravar_historico(self, df):
+        return compactar_historico(self.caminho_historico, df)
+
+    def versao_historico(self):
+        if not os.path.exists(self.caminho_historico): return None
+        return (os.path.getmtime(self.caminho_historico), os.path.getsize(self.caminho_historico))
+
+    def carregar_historico(self):
+        if not os.path.exists(self.caminho_historico) or os.path.getsize(self.caminho_historico) == 0:
+            return pd.DataFrame(columns=['Data', 'ValorTotal'])
+        return pd.read_csv(self.caminho_historico)
+
+    # --- Dividendos ---
+    def carregar_dividendos(self, tickers=None):
+        versao = os.path.getmtime(self.caminho_dividendos) if os.path.exists(self.caminho_dividendos) else None
+        if self._dividendos is None or versao != self._versao_dividendos:
+            if versao is None or os.path.getsize(self.caminho_dividendos) == 0:
+                self._dividendos = _dividendos_vazios()
+            else:
+                self._dividendos = _ler_datas(pd.read_csv(self.caminho_dividendos, dtype={'data_ex': str, 'data_pag': str, 'Tipo': str, 'Ativo': str}))
+            self._versao_dividendos = versao
+        if tickers is None:
+            return self._dividendos
+        return self._dividendos[self._dividendos['Ativo'].isin(list(tickers))]
+
+    def dividendos_entre(self, inicio, fim, tickers=None):
+        """Proventos com data de pagamento em [inicio, fim]."""
+        df = self.carregar_dividendos(tickers)
+        return df[(df['data_pag'] >= pd.Timestamp(inicio)) & (df['data_pag'] <= pd.Timestamp(fim))]
+
+    def substituir_dividendos(self, chaves, novos):
+        """Apaga os grupos (Ativo, data_ex, Tipo) de `chaves` e grava `novos` no lugar."""
+        existente = self.carregar_dividendos()
+        mantidas = existente[~_filtrar_chaves(existente, chaves)] if not existente.empty else existente
+        df = pd.concat([mantidas, novos.reindex(columns=COLUNAS_DIVIDENDOS)], ignore_index=True) if not mantidas.empty else novos.reindex(columns=COLUNAS_DIVIDENDOS)
+        df = df.sort_values(by='data_ex', ascending=False, kind='stable').reset_index(drop=True)
+        gravar_atomico(self.caminho_dividendos, df.to_csv(index=False, date_format='%Y-%m-%d'))
+        self._dividendos, self._versao_dividendos = df, os.path.getmtime(self.caminho_dividendos)
+
+    def carregar_sincronizacao(self):
+        if not os.path.exists(self.caminho_sincronizacao): return {}
+        try:
+            with open(self.caminho_sincronizacao, 'r', encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except (OSError, json.JSONDecodeError): return {}
+
+    def gravar_sincronizacao(self, atualizados):
+        ultima = self.carregar_sincronizacao()
+        ultima.update(atualizados)
+        gravar_atomico(self.caminho_sincronizacao, json.dumps(ultima, indent=4))
+
+    # --- Lista de tickers ---
+    def carregar_tickers(self):
+        try:
+            with open(self.caminho_tickers, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def gravar_tickers(self, dados):
+        gravar_atomico(self.caminho_tickers, json.dumps(dados, indent=4))
+
+
+ESQUEMA_SQLITE = """
+CREATE TABLE IF NOT EXISTS transacoes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ticker TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    data TEXT NOT NULL,
+    quantidade NUMERIC NOT NULL,
+    preco_unitario NUMERIC NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transacoes_ticker_data ON transacoes (ticker, data);
+CREATE INDEX IF NOT EXISTS idx_transacoes_data ON transacoes (data);
+
+CREATE TABLE IF NOT EXISTS snapshots (
+    data TEXT PRIMARY KEY,
+    valor_total REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS dividendos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ticker TEXT NOT NULL,
+    data_ex TEXT NOT NULL,
+    valor REAL,
+    tipo TEXT,
+    data_pag TEXT,
+    por_quantas_acoes NUMERIC
+);
+CREATE INDEX IF NOT EXISTS idx_dividendos_ticker_data_ex ON dividendos (ticker, data_ex);
+CREATE INDEX IF NOT EXISTS idx_dividendos_data_pag ON dividendos (data_pag);
+
+CREATE TABLE IF NOT EXISTS sincronizacao_dividendos (
+    ticker TEXT PRIMARY KEY,
+    atualizado_em TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS tickers (
+    ticker TEXT NOT NULL,
+    grupo TEXT NOT NULL,
+    PRIMARY KEY (grupo, ticker)
+);
+"""
+
+# Pares (ticker, data) por consulta em quantidades_em (2 parâmetros cada, abaixo do limite do SQLite)
+PARES_POR_CONSULTA = 400
+SQL_DIVIDENDOS = 'SELECT data_ex, valor, tipo AS "Tipo", data_pag, por_quantas_acoes AS "Por quantas ações", ticker AS "Ativo" FROM dividendos'
+
+
+class RepositorioSQLite:
+    """Backend opcional em SQLite, com índices em (ticker, data) e (ticker, data_ex)."""
+
+    def __init__(self, caminho=CAMINHO_SQLITE):
+        self.caminho = caminho
+        with closing(self._conectar()) as conexao:
+            conexao.executescript(ESQUEMA_SQLITE)
+
+    @property
+    def descricao(self):
+        return self.caminho
+
+    def _conectar(self):
+        conexao = sqlite3.connect(self.caminho, timeout=30)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        return conexao
+
+    def _consultar(self, sql, parametros=()):
+        with closing(self._conectar()) as conexao:
+            return pd.read_sql_query(sql, conexao, params=parametros)
+
+    def _executar(self, sql, parametros=(), varios=False):
+        with closing(self._conectar()) as conexao, conexao:
+            if varios:
+                conexao.executemany(sql, parametros)
+            else:
+                conexao.execute(sql, parametros)
+
+    # --- Transações ---
+    def carregar_carteira(self):
+        carteira = {}
+        with closing(self._conectar()) as conexao:
+            linhas = conexao.execute("SELECT ticker, tipo, data, quantidade, preco_unitario FROM transacoes ORDER BY id").fetchall()
+        for ticker, tipo, data, quantidade, preco_unitario in linhas:
+            carteira.setdefault(ticker, []).append({"tipo": tipo, "data": data, "quantidade": quantidade, "preco_unitario": preco_unitario})
+        return carteira
+
+    def versao_carteira(self):
+        with closing(self._conectar()) as conexao:
+            return tuple(conexao.execute("SELECT COUNT(*), MAX(id) FROM transacoes").fetchone())
+
+    def adicionar_transacao(self, ticker, transacao):
+        self.adicionar_transacoes([(ticker, transacao)])
+
+    def quantidades_em(self, pares, incluir_dia=False):
+        """Quantidade comprada antes de cada data (ou até ela, com incluir_dia=True), para [(ticker, data), ...].
+
+        Uma consulta por bloco de pares, que soma as compras pelo índice (ticker, data).
+        """
+        pares = [(ticker, _data_iso(data)) for ticker, data in pares]
+        comparacao = "<=" if incluir_dia else "<"
+        totais = {}
+        with closing(self._conectar()) as conexao:
+            for inicio in range(0, len(pares), PARES_POR_CONSULTA):
+                bloco = list(dict.fromkeys(pares[inicio:inicio + PARES_POR_CONSULTA]))
+                valores = ", ".join("(?, ?)" for _ in bloco)
+                linhas = conexao.execute(
+                    f"WITH pedidos (ticker, data) AS (VALUES {valores}) "
+                    "SELECT p.ticker, p.data, COALESCE(SUM(t.quantidade), 0) FROM pedidos p "
+                    f"LEFT JOIN transacoes t ON t.ticker = p.ticker AND t.tipo = 'compra' AND t.data {comparacao} p.data "
+                    "GROUP BY p.ticker, p.data",
+                    [valor for par in bloco for valor in par]).fetchall()
+                totais.update(((ticker, data), total) for ticker, data, total in linhas)
+        return np.array([totais[par] for par in pares], dtype=float)
+
+    def adicionar_transacoes(self, transacoes):
+        self._executar(
+            "INSERT INTO transacoes (ticker, tipo, data, quantidade, preco_unitario) VALUES (?, ?, ?, ?, ?)",
+            [(ticker, t["tipo"], t["data"], t["quantidade"], t["preco_unitario"]) for ticker, t in transacoes],
+            varios=True,
+        )
+
+    # --- Histórico de património ---
+    def registar_snapshot(self, data, valor_total):
+        with closing(self._conectar()) as conexao, conexao:
+            cursor = conexao.execute("INSERT OR IGNORE INTO snapshots (data, valor_total) VALUES (?, ?)", (data, float(valor_total)))
+            return cursor.rowcount > 0
+
+    def gravar_historico(self, df):
+        self._executar("INSERT OR REPLACE INTO snapshots (data, valor_total) VALUES (?, ?)",
+                       list(zip(df['Data'].astype(str), df['ValorTotal'].astype(float))), varios=True)
+        return self.carregar_historico()
+
+    def versao_historico(self):
+        with closing(self._conectar()) as conexao:
+            return tuple(conexao.execute("SELECT COUNT(*), MAX(data), SUM(valor_total) FROM snapshots").fetchone())
+
+    def carregar_historico(self):
+        return self._consultar('SELECT data AS "Data", valor_total AS "ValorTotal" FROM snapshots ORDER BY data')
+
+    # --- Dividendos ---
+    def carregar_dividendos(self, tickers=None):
+        if tickers is None:
+            return _ler_datas(self._consultar(SQL_DIVIDENDOS + " ORDER BY data_ex DESC"))
+        tickers = list(tickers)
+        if not tickers:
+            return _dividendos_vazios()
+        marcadores = ", ".join("?" * len(tickers))
+        return _ler_datas(self._consultar(SQL_DIVIDENDOS + f" WHERE ticker IN ({marcadores}) ORDER BY data_ex DESC", tickers))
+
+    def dividendos_entre(self, inicio, fim, tickers=None):
+        """Proventos com data de pagamento em [inicio, fim]."""
+        sql, parametros = SQL_DIVIDENDOS + " WHERE data_pag BETWEEN ? AND ?", [_data_iso(inicio), _data_iso(fim)]
+        if tickers is not None:
+            tickers = list(tickers)
+            sql += f" AND ticker IN ({', '.join('?' * len(tickers))})"
+            parametros += tickers
+        return _ler_datas(self._consultar(sql + " ORDER BY data_pag", parametros))
+
+    def substituir_dividendos(self, chaves, novos):
+        """Apaga os grupos (Ativo, data_ex, Tipo) de `chaves` e grava `novos` no lugar."""
+        novos = _gravar_datas(novos.reindex(columns=COLUNAS_DIVIDENDOS))
+        chaves = _gravar_datas(chaves[CHAVE_DIVIDENDOS].drop_duplicates())
+        with closing(self._conectar()) as conexao, conexao:
+            conexao.executemany(
+                "DELETE FROM dividendos WHERE ticker = ? AND data_ex = ? AND tipo IS ?",
+                chaves.itertuples(index=False, name=None))
+            conexao.executemany(
+                "INSERT INTO dividendos (data_ex, valor, tipo, data_pag, por_quantas_acoes, ticker) VALUES (?, ?, ?, ?, ?, ?)",
+                novos.itertuples(index=False, name=None))
+
+    def carregar_sincronizacao(self):
+        with closing(self._conectar()) as conexao:
+            return dict(conexao.execute("SELECT ticker, atualizado_em FROM sincronizacao_dividendos").fetchall())
+
+    def gravar_sincronizacao(self, atualizados):
+        self._executar("INSERT OR REPLACE INTO sincronizacao_dividendos (ticker, atualizado_em) VALUES (?, ?)",
+                       list(atualizados.items()), varios=True)
+
+    # --- Lista de tickers ---
+    def carregar_tickers(self):
+        dados = {}
+        with closing(self._conectar()) as conexao:
+            for ticker, grupo in conexao.execute("SELECT ticker, grupo FROM tickers ORDER BY grupo, ticker"):
+                dados.setdefault(grupo, []).append(ticker)
+        return dados
+
+    def gravar_tickers(self, dados):
+        with closing(self._conectar()) as conexao, conexao:
+            conexao.execute("DELETE FROM tickers")
+            conexao.executemany("INSERT OR IGNORE INTO tickers (ticker, grupo) VALUES (?, ?)",
+                                [(ticker, grupo) for grupo, tickers in dados.items() for ticker in tickers])
+
+
+def obter_repositorio():
+    """Repositório escolhido pela variável KINVO_BACKEND ('arquivos', padrão, ou 'sqlite')."""
+    if os.environ.get("KINVO_BACKEND", "arquivos").lower() == "sqlite":
+        return RepositorioSQLite(os.environ.get("KINVO_SQLITE", CAMINHO_SQLITE))
+    return RepositorioArquivos()
@@ -0,0 +1,70 @@
+import os
+import pickle
+from datetime import date, datetime, timedelta
+
+from backend.aquisicao import adquirir
+from backend.caminhos import caminho_dados
+from backend.diario import gravar_atomico
+from backend.instrumentacao import instrumentacao
+from backend.proventos import recebidos_em_12_meses
+
+CAMINHO_RESULTADOS = caminho_dados('resultados_carteira.pkl')
+IDADE_MAXIMA_RESULTADOS = timedelta(minutes=30)
+
+
+def calcular_resultados(repositorio, livro, buscar_precos, armazem_dividendos, motor, analise=None, proventos_em_segundo_plano=False):
+    """Cotações, proventos, cálculo da carteira, snapshot do dia e (opcionalmente) análise de rentabilidade.
+
+    Usado tanto pelo atualizador em segundo plano como pela aplicação quando não há
+    resultados pré-calculados recentes; a aplicação usa `proventos_em_segundo_plano`
+    para calcular com os proventos locais enquanto o Fundamentus é consultado.
+    """
+    livro.sincronizar(repositorio)
+    tickers = livro.tickers_com_posicao()
+    # Cotações e proventos vêm de fontes diferentes: pedem-se em simultâneo
+    fontes = {"cotacoes": (buscar_precos, tickers)}
+    if proventos_em_segundo_plano:
+        armazem_dividendos.sincronizar_em_segundo_plano(tickers)
+    else:
+        fontes["proventos"] = (armazem_dividendos.sincronizar, tickers)
+    with instrumentacao().medir("resultados.aquisicao", ativos=len(tickers)):
+        fontes = adquirir(fontes)
+    precos_atuais = fontes["cotacoes"] or {}
+    proventos_brutos = armazem_dividendos.proventos(tickers)
+    resultado = motor.calcular(livro, precos_atuais, proventos_brutos)
+    with instrumentacao().medir("resultados.recebidos_12_meses"):
+        resultado = dict(resultado, recebidos_12_meses=recebidos_em_12_meses(repositorio, tickers))
+    registar_snapshot_do_dia(repositorio, resultado)
+    if analise is not None:
+        with instrumentacao().medir("resultados.analise"):
+            resultado = dict(resultado, analise=analise.calcular(repositorio.carregar_historico(), livro.aportes, resultado["carteira"], resultado["direitos"]))
+    return resultado
+
+def registar_snapshot_do_dia(repositorio, resultado, hoje=None):
+    """Guarda o valor total da carteira de hoje (no máximo um registo por dia)."""
+    df_carteira = resultado["carteira"]
+    if df_carteira.empty: return
+    hoje = (hoje or date.today()).strftime('%Y-%m-%d')
+    repositorio.registar_snapshot(hoje, df_carteira["Valor Atual (R$)"].sum())
+
+def gravar_resultados(resultado, versao_carteira, caminho=CAMINHO_RESULTADOS):
+    conteudo = dict(resultado, versao_carteira=versao_carteira, gerado_em=datetime.now())
+    gravar_atomico(caminho, pickle.dumps(conteudo, protocol=pickle.HIGHEST_PROTOCOL))
+
+def _ler_resultados(caminho):
+    if not os.path.exists(caminho): return None
+    try:
+        with open(caminho, 'rb') as arquivo:
+            return pickle.load(arquivo)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError): return None
+
+def carregar_resultados(versao_carteira, idade_maxima=IDADE_MAXIMA_RESULTADOS, caminho=CAMINHO_RESULTADOS):
+    """Resultados pré-calculados, ou None se não existirem, forem antigos ou de outra versão da carteira."""
+    conteudo = _ler_resultados(caminho)
+    valido = conteudo is not None and conteudo.get("versao_carteira") == versao_carteira
+    gerado_em = conteudo.get("gerado_em") if valido else None
+    if gerado_em is None or gerado_em.date() != date.today() or datetime.now() - gerado_em > idade_maxima:
+        instrumentacao().contar("resultados.falhas")
+        return None
+    instrumentacao().contar("resultados.acertos")
+    return conteudo
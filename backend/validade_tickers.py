@@ -0,0 +1,80 @@
+import json
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+from backend.caminhos import caminho_dados
+from backend.diario import gravar_atomico
+from backend.historico_precos import armazem_precos
+
+CAMINHO_VALIDADE = caminho_dados('validade_tickers.json')
+VALIDADE_VALIDO = timedelta(days=30)
+VALIDADE_INVALIDO = timedelta(days=1)
+
+
+def verificar_ticker_na_rede(ticker_symbol):
+    """O ticker é válido se houver preços locais ou se o yfinance devolver a última semana."""
+    armazem = armazem_precos()
+    if armazem.tem_dados(ticker_symbol): return True
+    try:
+        hoje = date.today()
+        return not armazem.fechos([ticker_symbol], hoje - timedelta(days=7), hoje).dropna(how='all').empty
+    except Exception: return False
+
+
+class IndiceValidade:
+    """Tickers conhecidos como válidos ou inválidos, com prazo de validade.
+
+    A validação consulta primeiro o índice; só vai à rede quando o ticker não está
+    lá ou a entrada expirou.
+    """
+
+    def __init__(self, caminho=CAMINHO_VALIDADE, verificar=verificar_ticker_na_rede):
+        self.caminho = caminho
+        self._verificar = verificar
+        self._lock = threading.Lock()
+        self._entradas = self._carregar()
+
+    def _carregar(self):
+        if not os.path.exists(self.caminho): return {}
+        try:
+            with open(self.caminho, 'r', encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except (OSError, json.JSONDecodeError): return {}
+
+    def _gravar(self):
+        with self._lock:
+            conteudo = json.dumps(self._entradas, separators=(',', ':'))
+        gravar_atomico(self.caminho, conteudo)
+
+    def _registar(self, ticker, valido, agora=None):
+        agora = agora or datetime.now()
+        validade = VALIDADE_VALIDO if valido else VALIDADE_INVALIDO
+        self._entradas[ticker] = {"valido": valido, "expira_em": (agora + validade).isoformat(timespec='seconds')}
+
+    def semear(self, tickers):
+        """Marca como válidos os tickers dados (ex.: catálogo e carteira), sem apagar os restantes."""
+        agora = datetime.now()
+        with self._lock:
+            for ticker in tickers:
+                entrada = self._entradas.get(ticker)
+                if entrada is None or not entrada["valido"] or entrada["expira_em"] < agora.isoformat():
+                    self._registar(ticker, True, agora)
+        self._gravar()
+
+    def consultar(self, ticker):
+        """True/False se o índice tiver uma entrada válida; None se for preciso verificar."""
+        with self._lock:
+            entrada = self._entradas.get(ticker)
+        if entrada is None or entrada["expira_em"] < datetime.now().isoformat():
+            return None
+        return entrada["valido"]
+
+    def validar(self, ticker):
+        valido = self.consultar(ticker)
+        if valido is None:
+            valido = self._verificar(ticker)
+            with self._lock:
+                self._registar(ticker, valido)
+            self._gravar()
+        return valido
@@ -0,0 +1,156 @@
+"""Benchmarks dos caminhos críticos com uma carteira sintética grande.
+
+Gera a carteira, os preços e os proventos numa pasta temporária (KINVO_DADOS), serve o
+Fundamentus a partir de um servidor local e substitui o yfinance por preços sintéticos.
+Os tempos são acrescentados a `benchmarks/resultados.jsonl` (local a cada máquina, fora
+do git) e comparados com a última execução com os mesmos parâmetros.
+
+    python benchmarks/executar.py --tickers 300 --transacoes 5000 --anos 20
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+pasta_benchmarks = os.path.dirname(os.path.realpath(__file__))
+project_root = os.path.dirname(pasta_benchmarks)
+sys.path.insert(0, project_root)
+
+from sinteticos import FundamentusLocal, YFinanceLocal, gerar_carteira, gerar_tickers, gravar_carteira
+
+CAMINHO_RESULTADOS = os.path.join(pasta_benchmarks, 'resultados.jsonl')
+# Fração dos tickers com proventos sincronizados há mais tempo do que a idade máxima
+FRACAO_DESATUALIZADA = 0.1
+
+
+def medir(funcao, repeticoes):
+    """Mediana dos tempos (s) de `repeticoes` execuções, com a saída silenciada."""
+    tempos = []
+    for _ in range(repeticoes):
+        with contextlib.redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+def _commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=project_root, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _ultima_execucao(parametros, caminho):
+    if not os.path.exists(caminho): return None
+    anterior = None
+    with open(caminho, 'r', encoding='utf-8') as arquivo:
+        for linha in arquivo:
+            registo = json.loads(linha)
+            if registo.get("parametros") == parametros:
+                anterior = registo
+    return anterior
+
+def executar(n_tickers, n_transacoes, anos, repeticoes, saida):
+    parametros = {"tickers": n_tickers, "transacoes": n_transacoes, "anos": anos}
+    pasta = tempfile.mkdtemp(prefix='kinvo-bench-')
+    tickers = gerar_tickers(n_tickers)
+    carteira = gerar_carteira(tickers, n_transacoes, anos)
+    gravar_carteira(pasta, carteira)
+    fundamentus = FundamentusLocal(tickers, anos)
+
+    # O backend lê estas variáveis ao ser importado
+    os.environ["KINVO_DADOS"] = pasta
+    os.environ["KINVO_BACKEND"] = "arquivos"
+    os.environ["FUNDAMENTUS_URL"] = fundamentus.iniciar()
+    os.environ["FUNDAMENTUS_RPS"] = "10000"
+    yfinance = YFinanceLocal().instalar()
+
+    from backend.armazem_dividendos import IDADE_MAXIMA, ArmazemDividendos
+    from backend.cotacoes import buscar_precos_em_lote
+    from backend.motor import MotorCarteira
+    from backend.posicoes import LivroDePosicoes
+    from backend.proventos import calcular_direitos, lotes_do_livro, preparar_proventos, totais_por_status
+    from backend.repositorio import obter_repositorio
+    from backend.resultados import calcular_resultados
+    from scripts.backfill_dividendos import recriar_historico_dividendos
+    from scripts.backfill_historico import backfill_historico
+
+    tempos = {}
+    try:
+        repositorio = obter_repositorio()
+        tempos["livro_de_posicoes"] = medir(lambda: LivroDePosicoes.a_partir_da_carteira(repositorio.carregar_carteira()), repeticoes)
+        livro = LivroDePosicoes.a_partir_da_carteira(repositorio.carregar_carteira())
+        tickers_em_carteira = livro.tickers_com_posicao()
+
+        # Primeira execução: todos os proventos vêm do servidor local; depois, o caminho
+        # incremental, em que só uma fração dos tickers passou da idade máxima
+        tempos["recriar_historico_dividendos_frio"] = medir(lambda: recriar_historico_dividendos(timedelta(0)), 1)
+        tickers_b3 = [ticker for ticker in tickers_em_carteira if ticker.endswith('.SA')]
+        antigos = tickers_b3[:max(1, int(len(tickers_b3) * FRACAO_DESATUALIZADA))]
+        def _incremental():
+            vencido = (datetime.now() - IDADE_MAXIMA - timedelta(hours=1)).isoformat(timespec='seconds')
+            repositorio.gravar_sincronizacao({ticker: vencido for ticker in antigos})
+            recriar_historico_dividendos(IDADE_MAXIMA)
+        tempos["recriar_historico_dividendos_incremental"] = medir(_incremental, repeticoes)
+
+        proventos_brutos = ArmazemDividendos(repositorio).proventos(tickers_em_carteira)
+        lotes = lotes_do_livro(livro, tickers_em_carteira)
+        tempos["proventos_pos_processamento"] = medir(
+            lambda: totais_por_status(calcular_direitos(preparar_proventos(proventos_brutos), lotes)), repeticoes)
+
+        precos_atuais = buscar_precos_em_lote(tickers_em_carteira)
+        tempos["motor_carteira"] = medir(lambda: MotorCarteira().calcular(livro, precos_atuais, proventos_brutos), repeticoes)
+        motor = MotorCarteira()
+        motor.calcular(livro, precos_atuais, proventos_brutos)
+        tempos["motor_carteira_memoizado"] = medir(lambda: motor.calcular(livro, precos_atuais, proventos_brutos), repeticoes)
+        tempos["calculo_app_completo"] = medir(
+            lambda: calcular_resultados(repositorio, LivroDePosicoes(), buscar_precos_em_lote, ArmazemDividendos(repositorio), MotorCarteira()), repeticoes)
+
+        inicio_backfill = date.today() - timedelta(days=365 * anos)
+        pedidos_antes = yfinance.pedidos
+        tempos["backfill_historico_frio"] = medir(lambda: backfill_historico(inicio_backfill), 1)
+        pedidos_frio = yfinance.pedidos - pedidos_antes
+        tempos["backfill_historico"] = medir(lambda: backfill_historico(inicio_backfill), repeticoes)
+    finally:
+        fundamentus.parar()
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    registo = {
+        "data": datetime.now().isoformat(timespec='seconds'),
+        "commit": _commit_atual(),
+        "python": platform.python_version(),
+        "parametros": parametros,
+        "ativos_em_carteira": len(carteira),
+        "pedidos_yfinance_backfill_frio": pedidos_frio,
+        "tempos": {nome: round(segundos, 4) for nome, segundos in tempos.items()},
+    }
+    anterior = _ultima_execucao(parametros, saida)
+    with open(saida, 'a', encoding='utf-8') as arquivo:
+        arquivo.write(json.dumps(registo, ensure_ascii=False) + "\n")
+
+    print(f"Carteira sintética: {len(carteira)} ativos, {n_transacoes} compras, {anos} anos.")
+    print(f"{'Caminho':40} {'Tempo (s)':>10} {'Anterior':>10} {'Variação':>9}")
+    for nome, segundos in tempos.items():
+        antes = (anterior or {}).get("tempos", {}).get(nome)
+        variacao = f"{(segundos / antes - 1) * 100:+.0f}%" if antes else ""
+        print(f"{nome:40} {segundos:10.4f} {antes if antes is not None else '':>10} {variacao:>9}")
+    print(f"\nResultados acrescentados a '{saida}'.")
+    return registo
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mede os caminhos críticos com uma carteira sintética grande.")
+    parser.add_argument("--tickers", type=int, default=300, help="Número de ativos distintos. Padrão: 300.")
+    parser.add_argument("--transacoes", type=int, default=5000, help="Número de compras. Padrão: 5000.")
+    parser.add_argument("--anos", type=int, default=20, help="Anos de compras, preços e proventos. Padrão: 20.")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Execuções por medição (é registada a mediana). Padrão: 3.")
+    parser.add_argument("--saida", default=CAMINHO_RESULTADOS, help="Ficheiro JSONL onde os resultados são acrescentados.")
+    args = parser.parse_args()
+    executar(args.tickers, args.transacoes, args.anos, args.repeticoes, args.saida)
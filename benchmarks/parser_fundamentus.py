@@ -0,0 +1,106 @@
+"""Benchmark da leitura das páginas do Fundamentus: `pd.read_html` contra o leitor dedicado.
+
+Usa as páginas guardadas em `benchmarks/fixtures/` (geradas com `--gerar`), confirma que
+os dois caminhos dão o mesmo resultado e acrescenta os tempos a `benchmarks/resultados.jsonl`
+(local a cada máquina, fora do git).
+
+    python benchmarks/parser_fundamentus.py [--gerar]
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+from datetime import datetime
+from io import StringIO
+
+pasta_benchmarks = os.path.dirname(os.path.realpath(__file__))
+project_root = os.path.dirname(pasta_benchmarks)
+sys.path.insert(0, project_root)
+
+import pandas as pd
+
+from executar import CAMINHO_RESULTADOS, _commit_atual, _ultima_execucao, medir
+from sinteticos import gerar_tickers, pagina_proventos, pagina_resultado
+
+from backend.html_fundamentus import COLUNAS_PROVENTOS, ler_papeis, ler_proventos
+
+PASTA_FIXTURES = os.path.join(pasta_benchmarks, 'fixtures')
+# Menus, estilos e scripts à volta da tabela, como nas páginas reais
+MOLDURA = "<div class=\"menu\">" + "".join(f"<a href=\"/p{i}.php\">Item {i}</a>" for i in range(200)) + "</div>"
+RODAPE = "<script>" + "var x = 1;" * 2000 + "</script><table><tr><td>rodapé</td></tr></table>"
+
+
+def _com_moldura(pagina):
+    return pagina.replace("<body>", "<body>" + MOLDURA, 1).replace("</body>", RODAPE + "</body>", 1)
+
+def gerar_fixtures(pasta=PASTA_FIXTURES):
+    """Páginas de proventos de 5, 20 e 40 anos e uma página de resultados com 1000 papéis."""
+    os.makedirs(pasta, exist_ok=True)
+    paginas = {f"proventos_{anos}anos.html": pagina_proventos(f"FIXT{anos}", anos) for anos in (5, 20, 40)}
+    paginas["resultado.html"] = pagina_resultado([t.replace('.SA', '') for t in gerar_tickers(1000) if t.endswith('.SA')])
+    for nome, pagina in paginas.items():
+        with open(os.path.join(pasta, nome), 'w', encoding='utf-8') as arquivo:
+            arquivo.write(_com_moldura(pagina))
+
+def proventos_read_html(html):
+    """O caminho anterior: todas as tabelas via read_html e datas convertidas depois."""
+    df = pd.read_html(StringIO(html), decimal=',', thousands='.')[0]
+    df = df.rename(columns={"Data": "data_ex", "Valor": "valor", "Data de Pagamento": "data_pag"})
+    df['data_ex'] = pd.to_datetime(df['data_ex'], format='%d/%m/%Y').astype('datetime64[ns]')
+    df['data_pag'] = pd.to_datetime(df['data_pag'], format='%d/%m/%Y', errors='coerce').astype('datetime64[ns]')
+    return df.reindex(columns=COLUNAS_PROVENTOS)
+
+def papeis_read_html(html):
+    return pd.read_html(StringIO(html), decimal=',', thousands='.')[0]['Papel'].tolist()
+
+def executar(repeticoes, saida):
+    fixtures = sorted(glob.glob(os.path.join(PASTA_FIXTURES, '*.html')))
+    if not fixtures:
+        print(f"Sem páginas em '{PASTA_FIXTURES}'. Gere-as com --gerar.")
+        return None
+    tempos = {}
+    for caminho in fixtures:
+        nome = os.path.splitext(os.path.basename(caminho))[0]
+        with open(caminho, 'r', encoding='utf-8') as arquivo:
+            html = arquivo.read()
+        if nome.startswith('resultado'):
+            referencia, dedicado = papeis_read_html, ler_papeis
+            assert referencia(html) == dedicado(html), f"{nome}: papéis diferentes"
+        else:
+            referencia, dedicado = proventos_read_html, ler_proventos
+            pd.testing.assert_frame_equal(referencia(html), dedicado(html), check_dtype=False)
+        tempos[f"{nome}_read_html"] = medir(lambda: referencia(html), repeticoes)
+        tempos[f"{nome}_dedicado"] = medir(lambda: dedicado(html), repeticoes)
+
+    parametros = {"parser_fundamentus": [os.path.basename(caminho) for caminho in fixtures]}
+    registo = {
+        "data": datetime.now().isoformat(timespec='seconds'),
+        "commit": _commit_atual(),
+        "python": platform.python_version(),
+        "parametros": parametros,
+        "tempos": {nome: round(segundos, 5) for nome, segundos in tempos.items()},
+    }
+    anterior = _ultima_execucao(parametros, saida)
+    with open(saida, 'a', encoding='utf-8') as arquivo:
+        arquivo.write(json.dumps(registo, ensure_ascii=False) + "\n")
+
+    print(f"{'Página':24} {'read_html (s)':>14} {'dedicado (s)':>13} {'Ganho':>7} {'Anterior':>10}")
+    for caminho in fixtures:
+        nome = os.path.splitext(os.path.basename(caminho))[0]
+        antes, depois = tempos[f"{nome}_read_html"], tempos[f"{nome}_dedicado"]
+        anterior_dedicado = (anterior or {}).get("tempos", {}).get(f"{nome}_dedicado", "")
+        print(f"{nome:24} {antes:14.5f} {depois:13.5f} {antes / depois:6.1f}x {anterior_dedicado:>10}")
+    print(f"\nResultados acrescentados a '{saida}'.")
+    return registo
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara pd.read_html com o leitor dedicado das páginas do Fundamentus.")
+    parser.add_argument("--gerar", action="store_true", help="(Re)gera as páginas de teste em benchmarks/fixtures/.")
+    parser.add_argument("--repeticoes", type=int, default=20, help="Execuções por medição (é registada a mediana). Padrão: 20.")
+    parser.add_argument("--saida", default=CAMINHO_RESULTADOS, help="Ficheiro JSONL onde os resultados são acrescentados.")
+    args = parser.parse_args()
+    if args.gerar:
+        gerar_fixtures()
+    executar(args.repeticoes, args.saida)
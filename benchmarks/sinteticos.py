@@ -0,0 +1,197 @@
+"""Dados sintéticos e substitutos locais do yfinance e do Fundamentus para os benchmarks.
+
+Nada aqui importa o `backend`: as variáveis de ambiente (KINVO_DADOS, FUNDAMENTUS_URL)
+têm de ser definidas antes de o backend ser importado.
+"""
+import json
+import os
+import threading
+import zlib
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+TIPOS_PROVENTO = ["DIVIDENDO", "JRS CAP PROPRIO", "RENDIMENTO"]
+
+
+def _semente(texto):
+    return zlib.crc32(texto.encode())
+
+
+def gerar_tickers(quantidade, proporcao_cripto=0.1, proporcao_etf=0.1):
+    """Tickers fictícios: ações e ETFs da B3 ('.SA') e criptomoedas ('-USD')."""
+    n_cripto = max(1, int(quantidade * proporcao_cripto))
+    n_etf = max(1, int(quantidade * proporcao_etf))
+    n_acoes = quantidade - n_cripto - n_etf
+    acoes = [f"A{i:03d}{3 + i % 2}.SA" for i in range(n_acoes)]
+    etfs = [f"E{i:03d}11.SA" for i in range(n_etf)]
+    cripto = [f"C{i:03d}-USD" for i in range(n_cripto)]
+    return acoes + etfs + cripto
+
+
+def gerar_carteira(tickers, transacoes, anos, semente=42):
+    """{ticker: [compras]} com `transacoes` compras espalhadas pelos últimos `anos`."""
+    rng = np.random.default_rng(semente)
+    hoje = date.today()
+    dias = rng.integers(0, anos * 365, transacoes)
+    escolhidos = rng.integers(0, len(tickers), transacoes)
+    carteira = {}
+    for ticker in tickers:
+        carteira[ticker] = []
+    for indice, dias_atras in zip(escolhidos, dias):
+        ticker = tickers[indice]
+        cripto = ticker.endswith('-USD')
+        carteira[ticker].append({
+            "tipo": "compra",
+            "data": (hoje - timedelta(days=int(dias_atras))).isoformat(),
+            "quantidade": round(float(rng.uniform(0.01, 1.0)), 8) if cripto else int(rng.integers(1, 500)),
+            "preco_unitario": round(float(rng.uniform(1000, 50000)), 2) if cripto else round(float(rng.uniform(5, 100)), 2),
+        })
+    return {ticker: compras for ticker, compras in carteira.items() if compras}
+
+
+def gravar_carteira(pasta, carteira):
+    os.makedirs(pasta, exist_ok=True)
+    with open(os.path.join(pasta, 'carteira.json'), 'w', encoding='utf-8') as arquivo:
+        json.dump(carteira, arquivo)
+
+
+def serie_de_precos(ticker, inicio, fim):
+    """Passeio aleatório determinístico por ticker (dias úteis para a B3, todos os dias para o resto)."""
+    dias = pd.date_range(inicio, fim)
+    if not (ticker.endswith('-USD') or ticker == 'BRL=X'):
+        dias = dias[dias.dayofweek < 5]
+    if ticker == 'BRL=X':
+        base = 5.0
+    elif ticker.endswith('-USD'):
+        base = 1000.0 + _semente(ticker) % 50000
+    else:
+        base = 5.0 + _semente(ticker) % 95
+    # A série é calculada a partir de uma origem fixa, para que intervalos diferentes coincidam
+    origem = pd.Timestamp('1990-01-01')
+    passos = (dias - origem).days.to_numpy()
+    if not len(passos):
+        return pd.Series(dtype=float)
+    ruido = np.random.default_rng(_semente(ticker)).normal(0, 0.01, int(passos.max()) + 1).cumsum()
+    return pd.Series(base * np.exp(ruido[passos] * 0.5), index=dias)
+
+
+class YFinanceLocal:
+    """Substituto de `yf.download` e `yf.Ticker` com preços sintéticos e sem rede."""
+
+    def __init__(self):
+        self.pedidos = 0
+        self._cache = {}
+
+    def _serie(self, ticker, inicio, fim):
+        chave = (ticker, inicio, fim)
+        if chave not in self._cache:
+            self._cache[chave] = serie_de_precos(ticker, inicio, fim)
+        return self._cache[chave]
+
+    def download(self, tickers, start=None, end=None, period=None, **kwargs):
+        self.pedidos += 1
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        fim = pd.Timestamp(end) - pd.Timedelta(days=1) if end is not None else pd.Timestamp(date.today())
+        inicio = pd.Timestamp(start) if start is not None else fim - pd.Timedelta(days=7)
+        colunas = {}
+        for ticker in tickers:
+            serie = self._serie(ticker, inicio, fim)
+            for campo in ('Open', 'Close', 'Adj Close'):
+                colunas[(campo, ticker)] = serie
+        if not colunas:
+            return pd.DataFrame()
+        df = pd.DataFrame(colunas)
+        df.columns = pd.MultiIndex.from_tuples(df.columns, names=['Price', 'Ticker'])
+        return df
+
+    def Ticker(self, ticker):
+        substituto = self
+
+        class _Ticker:
+            @property
+            def info(self):
+                hoje = pd.Timestamp(date.today())
+                return {"regularMarketPrice": float(substituto._serie(ticker, hoje - pd.Timedelta(days=7), hoje).iloc[-1])}
+
+            def history(self, period='1d', **kwargs):
+                substituto.pedidos += 1
+                hoje = pd.Timestamp(date.today())
+                serie = substituto._serie(ticker, hoje - pd.Timedelta(days=7), hoje)
+                return pd.DataFrame({'Close': serie.iloc[-1:]})
+
+        return _Ticker()
+
+    def instalar(self):
+        import yfinance as yf
+        yf.download = self.download
+        yf.Ticker = self.Ticker
+        return self
+
+
+def pagina_proventos(papel, anos, por_ano=4):
+    """HTML no formato da página de proventos do Fundamentus (mais recentes primeiro)."""
+    rng = np.random.default_rng(_semente(papel))
+    hoje = date.today()
+    linhas = []
+    for i in range(anos * por_ano):
+        data_ex = hoje - timedelta(days=int(i * 365 / por_ano) + int(rng.integers(0, 20)))
+        data_pag = data_ex + timedelta(days=int(rng.integers(5, 60)))
+        valor = f"{rng.uniform(0.01, 2.5):.4f}".replace('.', ',')
+        tipo = TIPOS_PROVENTO[int(rng.integers(0, len(TIPOS_PROVENTO)))]
+        linhas.append(
+            f"<tr><td>{data_ex:%d/%m/%Y}</td><td>{valor}</td><td>{tipo}</td>"
+            f"<td>{data_pag:%d/%m/%Y}</td><td>1</td></tr>"
+        )
+    return (
+        "<html><body><table id=\"resultado\"><thead><tr><th>Data</th><th>Valor</th><th>Tipo</th>"
+        "<th>Data de Pagamento</th><th>Por quantas ações</th></tr></thead><tbody>"
+        + "".join(linhas) + "</tbody></table></body></html>"
+    )
+
+
+def pagina_resultado(papeis):
+    """HTML no formato da página de resultados (lista de papéis) do Fundamentus."""
+    linhas = "".join(f"<tr><td>{papel}</td><td>10,00</td></tr>" for papel in papeis)
+    return f"<html><body><table><thead><tr><th>Papel</th><th>Cotação</th></tr></thead><tbody>{linhas}</tbody></table></body></html>"
+
+
+class FundamentusLocal:
+    """Servidor HTTP local com páginas sintéticas de proventos e de resultados."""
+
+    def __init__(self, tickers, anos):
+        self.paginas = {t.replace('.SA', ''): pagina_proventos(t.replace('.SA', ''), anos) for t in tickers if t.endswith('.SA')}
+        self.resultado = pagina_resultado(sorted(self.paginas))
+        self._servidor = None
+
+    def iniciar(self):
+        paginas, resultado = self.paginas, self.resultado
+
+        class Pedido(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == '/resultado.php':
+                    corpo = resultado
+                else:
+                    papel = parse_qs(url.query).get('papel', [''])[0]
+                    corpo = paginas.get(papel, "<html><body>Nenhum provento</body></html>")
+                dados = corpo.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def log_message(self, *args):
+                pass
+
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', 0), Pedido)
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._servidor.server_address[1]}"
+
+    def parar(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
@@ -0,0 +1,56 @@
+import argparse
+from datetime import date, datetime
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from backend.analise import AnaliseRentabilidade
+from backend.armazem_dividendos import ArmazemDividendos
+from backend.cotacoes import buscar_precos_em_lote
+from backend.historico_precos import armazem_precos
+from backend.instrumentacao import instrumentacao, nova_execucao
+from backend.motor import MotorCarteira
+from backend.posicoes import LivroDePosicoes
+from backend.repositorio import obter_repositorio
+from backend.resultados import CAMINHO_RESULTADOS, calcular_resultados, gravar_resultados
+
+INTERVALO_PADRAO = 15
+
+
+def atualizar_uma_vez(repositorio, livro, armazem_dividendos, motor, analise):
+    nova_execucao()
+    inicio = time.perf_counter()
+    # Fechos desde a primeira compra para a análise por ativo (só as lacunas são descarregadas)
+    livro.sincronizar(repositorio)
+    if livro.aportes:
+        primeira_compra = min(aporte["Data"] for aporte in livro.aportes)
+        armazem_precos().atualizar(livro.tickers_com_posicao(), primeira_compra, date.today())
+    resultado = calcular_resultados(repositorio, livro, buscar_precos_em_lote, armazem_dividendos, motor, analise)
+    gravar_resultados(resultado, livro.versao)
+    instrumentacao().registar_etapa("atualizador.ciclo", time.perf_counter() - inicio)
+    instrumentacao().acrescentar_registo()
+    print(f"[{datetime.now():%d/%m/%Y %H:%M:%S}] {len(resultado['carteira'])} ativos calculados em {time.perf_counter() - inicio:.1f}s.")
+
+def executar(intervalo_minutos=INTERVALO_PADRAO, uma_vez=False):
+    repositorio = obter_repositorio()
+    livro = LivroDePosicoes()
+    armazem_dividendos = ArmazemDividendos(repositorio)
+    motor = MotorCarteira()
+    analise = AnaliseRentabilidade()
+    print(f"A atualizar a carteira de '{repositorio.descricao}' para '{CAMINHO_RESULTADOS}'.")
+    while True:
+        try:
+            atualizar_uma_vez(repositorio, livro, armazem_dividendos, motor, analise)
+        except Exception as e:
+            print(f"Erro ao atualizar a carteira: {e}")
+        if uma_vez: return
+        time.sleep(intervalo_minutos * 60)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Busca cotações e proventos periodicamente e pré-calcula a carteira para a aplicação.")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_PADRAO, help=f"Minutos entre atualizações. Padrão: {INTERVALO_PADRAO}.")
+    parser.add_argument("--uma-vez", action="store_true", help="Faz uma única atualização e termina (útil para cron).")
+    args = parser.parse_args()
+    executar(args.intervalo, args.uma_vez)
@@ -0,0 +1,177 @@
+"""Avalia em lote todas as carteiras de uma pasta (um ficheiro JSON por cliente).
+
+Os tickers de todas as carteiras são juntados e os fechos, o câmbio e os proventos são
+buscados uma única vez (em simultâneo), numa pasta de dados própria do lote e não na
+de data/; cada carteira é depois avaliada num processo separado (posições, histórico
+de património e proventos a que tem direito), toda ela nos fechos da data final.
+
+    python scripts/avaliar_carteiras.py pasta_das_carteiras --saida resultados_lote
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from backend.aquisicao import adquirir
+from backend.armazem_dividendos import ArmazemDividendos
+from backend.cambio import SerieCambio
+from backend.diario import DiarioCarteira, gravar_atomico
+from backend.historico import calcular_valor_diario, matriz_de_posicoes
+from backend.historico_precos import DIAS_SEM_PREGAO, ArmazemPrecos
+from backend.instrumentacao import instrumentacao, nova_execucao
+from backend.motor import MotorCarteira
+from backend.posicoes import LivroDePosicoes
+from backend.repositorio import RepositorioArquivos
+
+DIAS_HISTORICO_PADRAO = 90
+# Proventos, fechos e câmbio do lote ficam aqui, separados dos dados da aplicação
+PASTA_DADOS_PADRAO = "dados_lote"
+COLUNAS_RESUMO = ["Carteira", "Ativos", "Valor Total Investido (R$)", "Valor Atual (R$)", "Rentabilidade (%)",
+                  "Dividendos Recebidos (R$)", "Dividendos a Receber (R$)"]
+
+# Dados partilhados, entregues uma vez a cada processo (ver _iniciar_processo)
+_dados = None
+
+
+def carregar_carteiras(pasta):
+    """{nome: carteira} para cada ficheiro .json da pasta (com o diário .jsonl, se existir)."""
+    carteiras = {}
+    for caminho in sorted(glob.glob(os.path.join(pasta, '*.json'))):
+        nome = os.path.splitext(os.path.basename(caminho))[0]
+        try:
+            carteira = DiarioCarteira(caminho).carregar()
+        except Exception as e:
+            print(f"Erro ao ler a carteira '{caminho}': {e}")
+            continue
+        if carteira:
+            carteiras[nome] = carteira
+    return carteiras
+
+def universo_de_tickers(carteiras):
+    """Tickers distintos de todas as carteiras, sem repetições."""
+    return sorted({ticker for carteira in carteiras.values() for ticker in carteira})
+
+def carteira_ate(carteira, data):
+    """Só as transações feitas até `data` (inclusive)."""
+    data = data.isoformat()
+    return {ticker: [t for t in transacoes if t["data"] <= data] for ticker, transacoes in carteira.items()}
+
+def buscar_dados_partilhados(universo, data_inicial, data_final, pasta_dados=PASTA_DADOS_PADRAO):
+    """Proventos, fechos e câmbio de todo o universo, buscados uma só vez e em simultâneo.
+
+    Os fechos são convertidos para reais uma só vez; os preços das posições são os de
+    `data_final` (ou o último antes dela), os mesmos que fecham o histórico de património.
+    """
+    armazem = ArmazemPrecos(os.path.join(pasta_dados, 'precos'))
+    armazem_dividendos = ArmazemDividendos(RepositorioArquivos(pasta_dados))
+    cambio = SerieCambio(armazem=armazem)
+    with instrumentacao().medir("lote.aquisicao", tickers=len(universo)):
+        fontes = adquirir({
+            "proventos": (armazem_dividendos.sincronizar, universo),
+            "fechos": (armazem.fechos, universo, data_inicial - timedelta(days=DIAS_SEM_PREGAO), data_final),
+            "cambio": (cambio.atualizar, data_inicial - timedelta(days=DIAS_SEM_PREGAO), data_final),
+        })
+    dias = pd.date_range(start=data_inicial, end=data_final)
+    if fontes["fechos"] is None or fontes["fechos"].empty:
+        fechos = pd.DataFrame(columns=universo)
+    else:
+        fechos = cambio.converter(fontes["fechos"])
+    ultimos = fechos.ffill().iloc[-1] if not fechos.empty else pd.Series(dtype=float)
+    return {
+        "precos_atuais": {ticker: float(preco) for ticker, preco in ultimos.items() if pd.notna(preco)},
+        "proventos": armazem_dividendos.proventos(universo),
+        # Inclui os dias antes do início: o reindex em calcular_valor_diario usa-os no ffill
+        "fechos": fechos,
+        "dias": dias,
+        "hoje": data_final,
+    }
+
+def _iniciar_processo(dados):
+    global _dados
+    _dados = dados
+
+def avaliar_carteira(nome, carteira, pasta_saida):
+    """Avalia uma carteira com os dados partilhados do processo e grava os seus ficheiros."""
+    carteira = carteira_ate(carteira, _dados["hoje"])
+    livro = LivroDePosicoes.a_partir_da_carteira(carteira)
+    tickers = livro.tickers_com_posicao()
+    precos_atuais = {ticker: _dados["precos_atuais"][ticker] for ticker in tickers if ticker in _dados["precos_atuais"]}
+    proventos = _dados["proventos"][_dados["proventos"]["Ativo"].isin(tickers)]
+    resultado = MotorCarteira().calcular(livro, precos_atuais, proventos, _dados["hoje"])
+
+    posicoes = matriz_de_posicoes(carteira, _dados["dias"])
+    valores = calcular_valor_diario(posicoes, _dados["fechos"])
+    historico = pd.DataFrame({'Data': valores.index.strftime('%Y-%m-%d'), 'ValorTotal': valores.to_numpy()})
+
+    pasta = os.path.join(pasta_saida, nome)
+    os.makedirs(pasta, exist_ok=True)
+    gravar_atomico(os.path.join(pasta, 'carteira.csv'), resultado["carteira"].to_csv(index=False))
+    gravar_atomico(os.path.join(pasta, 'proventos.csv'), resultado["proventos"].to_csv(index=False))
+    gravar_atomico(os.path.join(pasta, 'historico.csv'), historico.to_csv(index=False))
+
+    df_carteira = resultado["carteira"]
+    investido = float(df_carteira["Custo Total (R$)"].sum()) if not df_carteira.empty else 0.0
+    atual = float(df_carteira["Valor Atual (R$)"].sum()) if not df_carteira.empty else 0.0
+    return {
+        "Carteira": nome,
+        "Ativos": len(df_carteira),
+        "Valor Total Investido (R$)": investido,
+        "Valor Atual (R$)": atual,
+        "Rentabilidade (%)": (atual / investido - 1) * 100 if investido > 0 else 0.0,
+        "Dividendos Recebidos (R$)": float(df_carteira["Dividendos Recebidos (R$)"].sum()) if not df_carteira.empty else 0.0,
+        "Dividendos a Receber (R$)": float(df_carteira["Dividendos a Receber (R$)"].sum()) if not df_carteira.empty else 0.0,
+    }
+
+def avaliar_carteiras(pasta, pasta_saida, data_inicial=None, data_final=None, processos=None, pasta_dados=PASTA_DADOS_PADRAO):
+    inicio = time.perf_counter()
+    nova_execucao()
+    if data_final is not None and data_final > date.today():
+        print(f"Erro: a data final {data_final} está no futuro!")
+        return None
+    carteiras = carregar_carteiras(pasta)
+    if not carteiras:
+        print(f"Erro: nenhuma carteira encontrada em '{pasta}'!")
+        return None
+    universo = universo_de_tickers(carteiras)
+    data_final = data_final or date.today()
+    data_inicial = data_inicial or data_final - timedelta(days=DIAS_HISTORICO_PADRAO)
+    print(f"{len(carteiras)} carteiras com {len(universo)} tickers distintos. A buscar os dados de mercado uma única vez...")
+    dados = buscar_dados_partilhados(universo, data_inicial, data_final, pasta_dados)
+
+    print(f"A avaliar as carteiras de {data_inicial} a {data_final}, com os preços de fecho de {data_final}...")
+    linhas = []
+    with instrumentacao().medir("lote.avaliacao", carteiras=len(carteiras)):
+        with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_processo, initargs=(dados,)) as executor:
+            futuros = {executor.submit(avaliar_carteira, nome, carteira, pasta_saida): nome for nome, carteira in carteiras.items()}
+            for futuro in as_completed(futuros):
+                try:
+                    linhas.append(futuro.result())
+                except Exception as e:
+                    print(f"Erro ao avaliar a carteira '{futuros[futuro]}': {e}")
+
+    resumo = pd.DataFrame(linhas, columns=COLUNAS_RESUMO).sort_values("Carteira").reset_index(drop=True)
+    os.makedirs(pasta_saida, exist_ok=True)
+    gravar_atomico(os.path.join(pasta_saida, 'resumo.csv'), resumo.to_csv(index=False))
+    print(f"\n{len(resumo)} carteiras avaliadas em {time.perf_counter() - inicio:.1f}s. Resumo em '{os.path.join(pasta_saida, 'resumo.csv')}':")
+    print(resumo.to_string(index=False, float_format=lambda valor: f"{valor:,.2f}"))
+    instrumentacao().imprimir_resumo()
+    instrumentacao().acrescentar_registo()
+    return resumo
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Avalia em lote as carteiras de uma pasta, buscando os dados de mercado uma única vez.")
+    parser.add_argument("pasta", help="Pasta com uma carteira por ficheiro .json (no formato de data/carteira.json).")
+    parser.add_argument("--saida", default="resultados_lote", help="Pasta dos resultados por carteira e do resumo. Padrão: resultados_lote.")
+    parser.add_argument("--inicio", type=date.fromisoformat, help=f"Data inicial do histórico (AAAA-MM-DD). Padrão: {DIAS_HISTORICO_PADRAO} dias antes do fim.")
+    parser.add_argument("--fim", type=date.fromisoformat, help="Data da avaliação (AAAA-MM-DD): posições, preços e proventos nessa data. Padrão: hoje.")
+    parser.add_argument("--processos", type=int, help="Número de processos. Padrão: um por CPU.")
+    parser.add_argument("--dados", default=PASTA_DADOS_PADRAO, help=f"Pasta dos proventos, fechos e câmbio do lote. Padrão: {PASTA_DADOS_PADRAO}.")
+    args = parser.parse_args()
+    avaliar_carteiras(args.pasta, args.saida, args.inicio, args.fim, args.processos, args.dados)
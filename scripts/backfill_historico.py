@@ -1,84 +1,63 @@
+import argparse
 import pandas as pd
-import yfinance as yf
 from datetime import date, timedelta
-import json
 import os
+import sys
 
-def carregar_carteira():
-    if not os.path.exists('data/carteira.json'):
-        print("Erro: Ficheiro 'data/carteira.json' não encontrado!")
-        return None
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from backend.cambio import serie_cambio
+from backend.historico import calcular_valor_diario, matriz_de_posicoes
+from backend.historico_precos import DIAS_SEM_PREGAO, armazem_precos
+from backend.instrumentacao import instrumentacao
+from backend.repositorio import obter_repositorio
+
+def carregar_carteira(repositorio):
     try:
-        with open('data/carteira.json', 'r', encoding='utf-8') as arquivo:
-            return json.load(arquivo)
+        carteira = repositorio.carregar_carteira()
     except Exception as e:
-        print(f"Erro ao ler o ficheiro JSON: {e}")
+        print(f"Erro ao ler a carteira: {e}")
         return None
+    if not carteira:
+        print(f"Erro: nenhuma transação encontrada em '{repositorio.descricao}'!")
+    return carteira
 
-def backfill_historico():
+def backfill_historico(data_inicial=None, data_final=None):
     print("Iniciando o preenchimento do histórico da carteira...")
     
-    carteira = carregar_carteira()
+    repositorio = obter_repositorio()
+    carteira = carregar_carteira(repositorio)
     if not carteira: return
 
-    data_final = date.today()
-    data_inicial = data_final - timedelta(days=90)
+    data_final = data_final or date.today()
+    data_inicial = data_inicial or data_final - timedelta(days=90)
     
     print(f"Buscando dados históricos de {data_inicial} a {data_final}...")
 
-    tickers_brl = [t for t in carteira.keys() if t.endswith('.SA')]
-    tickers_usd = [t for t in carteira.keys() if t.endswith('-USD')]
-    
-    historico_precos_brl = yf.download(tickers_brl, start=data_inicial, end=data_final, auto_adjust=False)['Close'] if tickers_brl else pd.DataFrame()
-    historico_precos_usd = yf.download(tickers_usd, start=data_inicial, end=data_final, auto_adjust=False)['Close'] if tickers_usd else pd.DataFrame()
-    taxa_dolar_historico = yf.download("BRL=X", start=data_inicial, end=data_final, auto_adjust=False)['Close']
+    # Alguns dias antes do início, para que um início em fim de semana ou feriado herde o último fecho
+    with instrumentacao().medir("backfill.precos", tickers=len(carteira)):
+        precos = armazem_precos().fechos(list(carteira.keys()), data_inicial - timedelta(days=DIAS_SEM_PREGAO), data_final)
+    with instrumentacao().medir("backfill.cambio"):
+        cambio = serie_cambio().atualizar(data_inicial - timedelta(days=DIAS_SEM_PREGAO), data_final)
 
-    dados_historicos_gerados = []
-    
-    print("\nProcessando histórico dia a dia...")
-    for dia in pd.date_range(start=data_inicial, end=data_final):
-        valor_total_no_dia = 0.0
-        taxa_dolar_no_dia = taxa_dolar_historico.asof(dia)
-        
-        for ticker, transacoes in carteira.items():
-            quantidade_no_dia = sum(t['quantidade'] for t in transacoes if t['tipo'] == 'compra' and pd.to_datetime(t['data']).date() <= dia.date())
-            
-            if quantidade_no_dia > 0:
-                valor_do_ativo = 0
-                try:
-                    if ticker in tickers_brl and not historico_precos_brl.empty:
-                        preco_no_dia = historico_precos_brl[ticker].asof(dia)
-                        valor_do_ativo = quantidade_no_dia * preco_no_dia
-                    
-                    elif ticker in tickers_usd and not historico_precos_usd.empty:
-                        preco_no_dia_usd = historico_precos_usd[ticker].asof(dia)
-                        if isinstance(preco_no_dia_usd, pd.Series): preco_no_dia_usd = preco_no_dia_usd.iloc[0]
-                        if isinstance(taxa_dolar_no_dia, pd.Series): taxa_dolar_no_dia = taxa_dolar_no_dia.iloc[0]
-                        valor_do_ativo = quantidade_no_dia * preco_no_dia_usd * taxa_dolar_no_dia
-                    
-                    if pd.notna(valor_do_ativo):
-                        valor_total_no_dia += valor_do_ativo
-                except Exception:
-                    pass
-        
-        if valor_total_no_dia > 0:
-            dados_historicos_gerados.append({ 'Data': dia.strftime('%Y-%m-%d'), 'ValorTotal': valor_total_no_dia })
+    print("\nCalculando o valor diário da carteira...")
+    dias = pd.date_range(start=data_inicial, end=data_final)
+    with instrumentacao().medir("backfill.calculo", dias=len(dias)):
+        valores = calcular_valor_diario(matriz_de_posicoes(carteira, dias), cambio.converter(precos))
+    df_gerado = pd.DataFrame({'Data': valores.index.strftime('%Y-%m-%d'), 'ValorTotal': valores.to_numpy()})
 
-    if dados_historicos_gerados:
-        df_gerado = pd.DataFrame(dados_historicos_gerados)
-        # Agora verificamos se o ficheiro existe E se não está vazio
-        if os.path.exists('data/historico_portfolio.csv') and os.path.getsize('data/historico_portfolio.csv') > 0:
-            df_existente = pd.read_csv('data/historico_portfolio.csv')
-            df_final = pd.concat([df_existente, df_gerado], ignore_index=True)
-        else:
-            df_final = df_gerado
-        df_final.drop_duplicates(subset='Data', keep='last', inplace=True)
-        df_final.sort_values(by='Data', inplace=True)
-        df_final.to_csv('data/historico_portfolio.csv', index=False)
-        print("\nFicheiro 'data/historico_portfolio.csv' criado/atualizado com sucesso!")
+    if not df_gerado.empty:
+        df_final = repositorio.gravar_historico(df_gerado)
+        print(f"\nHistórico de património atualizado com sucesso em '{repositorio.descricao}'!")
         print(f"{len(df_final)} registos de histórico foram guardados.")
     else:
         print("Nenhum dado de histórico foi gerado.")
+    instrumentacao().imprimir_resumo()
+    instrumentacao().acrescentar_registo()
 
 if __name__ == "__main__":
-    backfill_historico()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Preenche o histórico de valor da carteira retroativamente.")
+    parser.add_argument("--inicio", type=date.fromisoformat, help="Data inicial (AAAA-MM-DD). Padrão: 90 dias antes do fim.")
+    parser.add_argument("--fim", type=date.fromisoformat, help="Data final (AAAA-MM-DD). Padrão: hoje.")
+    args = parser.parse_args()
+    backfill_historico(args.inicio, args.fim)
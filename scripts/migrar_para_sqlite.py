@@ -0,0 +1,51 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from backend.repositorio import CAMINHO_SQLITE, RepositorioArquivos, RepositorioSQLite
+
+def migrar_para_sqlite(destino=CAMINHO_SQLITE, substituir=False):
+    """Copia carteira, históricos e lista de tickers dos ficheiros em data/ para SQLite."""
+    if os.path.exists(destino):
+        if not substituir:
+            print(f"Erro: '{destino}' já existe. Use --substituir para recriar a base de dados.")
+            return
+        # Com journal_mode=WAL, o -wal e o -shm antigos seriam aplicados à base nova
+        for caminho in (destino, destino + '-wal', destino + '-shm'):
+            if os.path.exists(caminho):
+                os.remove(caminho)
+
+    print(f"Migrando os ficheiros de dados para '{destino}'...")
+    origem = RepositorioArquivos()
+    sqlite = RepositorioSQLite(destino)
+
+    carteira = origem.carregar_carteira()
+    sqlite.adicionar_transacoes([(ticker, t) for ticker, transacoes in carteira.items() for t in transacoes])
+    print(f"-> {sum(len(t) for t in carteira.values())} transações.")
+
+    historico = origem.carregar_historico()
+    if not historico.empty:
+        sqlite.gravar_historico(historico)
+    print(f"-> {len(historico)} registos de património.")
+
+    dividendos = origem.carregar_dividendos()
+    if not dividendos.empty:
+        sqlite.substituir_dividendos(dividendos, dividendos)
+    sqlite.gravar_sincronizacao(origem.carregar_sincronizacao())
+    print(f"-> {len(dividendos)} proventos.")
+
+    tickers = origem.carregar_tickers()
+    if tickers:
+        sqlite.gravar_tickers(tickers)
+    print(f"-> {sum(len(t) for t in tickers.values())} tickers na lista de ativos.")
+
+    print("\nSucesso! Para usar a base de dados, defina KINVO_BACKEND=sqlite antes de iniciar a aplicação.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migra os ficheiros de data/ para o backend SQLite.")
+    parser.add_argument("--destino", default=CAMINHO_SQLITE, help="Caminho da base de dados SQLite.")
+    parser.add_argument("--substituir", action="store_true", help="Apaga e recria a base de dados se já existir.")
+    args = parser.parse_args()
+    migrar_para_sqlite(args.destino, args.substituir)
@@ -1,22 +1,23 @@
-import pandas as pd
 import requests
-import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from backend.aquisicao import adquirir
+from backend.catalogo import ATIVOS_MANUAIS, CAMINHO_CATALOGO, CatalogoTickers
+from backend.fundamentus import extrair_tickers_b3
+from backend.instrumentacao import instrumentacao
+from backend.repositorio import obter_repositorio
+from backend.validade_tickers import IndiceValidade
+
+TIMEOUT_COINGECKO = 15
 
 def fetch_b3_tickers():
     """Busca tickers da B3 via scraping do Fundamentus."""
     print("Buscando tickers de ações da B3...")
     try:
-        url = "https://www.fundamentus.com.br/resultado.php"
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        tabelas = pd.read_html(response.text, decimal=',', thousands='.')
-        if not tabelas:
-            return []
-        df = tabelas[0]
-        tickers_sa = [ticker + ".SA" for ticker in df['Papel'].tolist()]
+        tickers_sa = [ticker + ".SA" for ticker in extrair_tickers_b3()]
         print(f"-> {len(tickers_sa)} tickers de ações encontrados.")
         return tickers_sa
     except Exception as e:
@@ -29,7 +30,7 @@ def fetch_crypto_tickers():
     try:
         # URL da API do CoinGecko para buscar o ranking de moedas por mercado
         url = "https://api.coingecko.com/api/v3/coins/markets?vs_currency=usd&order=market_cap_desc&per_page=250&page=1"
-        response = requests.get(url)
+        response = requests.get(url, timeout=TIMEOUT_COINGECKO)
         response.raise_for_status()
         dados = response.json()
         
@@ -45,11 +46,14 @@ def atualizar_lista_completa():
     """Executa todas as buscas e guarda o resultado num ficheiro JSON estruturado."""
     print("Iniciando a atualização da lista completa de ativos...")
     
-    b3_tickers = fetch_b3_tickers()
-    crypto_tickers = fetch_crypto_tickers()
+    # A B3 e o CoinGecko são independentes: os dois pedidos correm em simultâneo
+    with instrumentacao().medir("tickers.aquisicao"):
+        fontes = adquirir({"b3": (fetch_b3_tickers,), "cripto": (fetch_crypto_tickers,)})
+    b3_tickers = fontes["b3"] or []
+    crypto_tickers = fontes["cripto"] or []
     
     # Adiciona alguns ETFs manualmente, pois não estão nas listas automáticas
-    etfs = ["GOLD11.SA", "BOVA11.SA", "SMAL11.SA", "IVVB11.SA"]
+    etfs = list(ATIVOS_MANUAIS)
 
     dados_finais = {
         "acoes_b3": sorted(b3_tickers),
@@ -57,10 +61,20 @@ def atualizar_lista_completa():
         "etfs": sorted(etfs)
     }
 
-    with open('data/all_tickers.json', 'w', encoding='utf-8') as f:
-        json.dump(dados_finais, f, indent=4)
+    repositorio = obter_repositorio()
+    repositorio.gravar_tickers(dados_finais)
     total = len(b3_tickers) + len(crypto_tickers) + len(etfs)
-    print(f"\nSucesso! {total} tickers foram guardados em 'data/all_tickers.json'.")
+    print(f"\nSucesso! {total} tickers foram guardados em '{repositorio.descricao}'.")
+
+    with instrumentacao().medir("tickers.catalogo"):
+        catalogo = CatalogoTickers.de_dados(dados_finais)
+        catalogo.gravar()
+    print(f"Catálogo de pesquisa com {len(catalogo.tickers)} tickers guardado em '{CAMINHO_CATALOGO}'.")
+
+    IndiceValidade().semear(catalogo.tickers)
+    print("Índice de validade de tickers atualizado.")
+    instrumentacao().imprimir_resumo()
+    instrumentacao().acrescentar_registo()
 
 if __name__ == "__main__":
     atualizar_lista_completa()
\ No newline at end of file